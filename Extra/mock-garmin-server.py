@@ -0,0 +1,353 @@
+# %%
+# Local mock Garmin Connect API server for end-to-end soak and scale testing of garmin-fetch.py
+# Serves deterministic synthetic users (daily stats, sleep, intraday arrays, FIT/TCX activities) and injects configurable faults.
+#
+# Usage :
+#   python mock-garmin-server.py --write-tokens ./mock-tokens --user 1     (writes login tokens for synthetic user 1, then exits)
+#   python mock-garmin-server.py --port 8765 --history-days 1095 --error-rate-429 0.01 --latency-ms 50
+# Then run garmin-fetch.py with TOKEN_DIR=./mock-tokens and GARMINCONNECT_MOCK_URL=http://localhost:8765
+# Request counters are available at http://localhost:8765/mock/stats
+import argparse, io, json, logging, math, os, random, struct, sys, threading, time, zipfile
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+FIT_EPOCH_OFFSET = 631065600 # seconds between unix epoch and FIT epoch (1989-12-31 00:00:00 UTC)
+ACTIVITY_TYPES = ["running", "cycling", "walking", "hiking"]
+STATS = {"requests": 0, "injected_429": 0, "injected_timeouts": 0, "bytes_sent": 0, "started": time.time()}
+STATS_LOCK = threading.Lock()
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s", handlers=[logging.StreamHandler(sys.stdout)])
+
+# %%
+def day_rng(user, date_str, kind, seed):
+    return random.Random(f"{seed}-{user}-{date_str}-{kind}")
+
+def epoch_ms(dt):
+    return int(dt.timestamp() * 1000)
+
+def gmt_string(dt):
+    return dt.strftime("%Y-%m-%dT%H:%M:%S.0")
+
+def day_start(date_str):
+    return datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=timezone.utc)
+
+def heart_rate_at(user, dt, seed, activities):
+    minutes = dt.hour * 60 + dt.minute
+    rng = random.Random(f"{seed}-{user}-{dt.isoformat()}-hr")
+    heart_rate = 52 + 18 * max(0.0, math.sin((minutes - 360) / 1440 * 2 * math.pi)) + rng.gauss(0, 3)
+    for activity in activities:
+        if activity["start"] <= dt < activity["start"] + timedelta(seconds=activity["duration"]):
+            heart_rate = 135 + 20 * math.sin((dt - activity["start"]).total_seconds() / 600) + rng.gauss(0, 4)
+    return int(round(heart_rate))
+
+def get_activities_for_date(user, date_str, seed):
+    rng = day_rng(user, date_str, "activities", seed)
+    activities = []
+    for index in range(rng.choice([0, 0, 1, 1, 1, 2])):
+        start = day_start(date_str) + timedelta(hours=rng.choice([6, 7, 12, 17, 18]) + 6 * index, minutes=rng.randint(0, 59))
+        activities.append({
+            "id": int(f"{user}{date_str.replace('-', '')}{index}"),
+            "type": rng.choice(ACTIVITY_TYPES),
+            "start": start,
+            "duration": rng.randint(20, 120) * 60,
+            "lat": 51.5 + rng.uniform(-0.05, 0.05) + user * 0.1,
+            "lon": -0.12 + rng.uniform(-0.05, 0.05),
+        })
+    return activities
+
+def activity_from_id(user, activity_id, seed):
+    id_str = str(activity_id)[len(str(user)):]
+    date_str = f"{id_str[0:4]}-{id_str[4:6]}-{id_str[6:8]}"
+    return next((activity for activity in get_activities_for_date(user, date_str, seed) if activity["id"] == int(activity_id)), None)
+
+def activity_track(user, activity, seed):
+    # One record per second along a circular route
+    track = []
+    for second in range(0, activity["duration"]):
+        angle = second / activity["duration"] * 2 * math.pi
+        point_time = activity["start"] + timedelta(seconds=second)
+        track.append({
+            "time": point_time,
+            "lat": activity["lat"] + 0.01 * math.sin(angle),
+            "lon": activity["lon"] + 0.015 * (1 - math.cos(angle)),
+            "altitude": 30 + 10 * math.sin(angle * 3),
+            "distance": second * 2.8,
+            "speed": 2.8,
+            "heart_rate": heart_rate_at(user, point_time, seed, [activity]),
+        })
+    return track
+
+# %%
+def fit_crc(data, crc=0):
+    crc_table = [0x0000, 0xCC01, 0xD801, 0x1400, 0xF001, 0x3C00, 0x2800, 0xE401, 0xA001, 0x6C00, 0x7800, 0xB401, 0x5000, 0x9C01, 0x8801, 0x4400]
+    for byte in data:
+        tmp = crc_table[crc & 0xF]
+        crc = (crc >> 4) & 0x0FFF
+        crc = crc ^ tmp ^ crc_table[byte & 0xF]
+        tmp = crc_table[crc & 0xF]
+        crc = (crc >> 4) & 0x0FFF
+        crc = crc ^ tmp ^ crc_table[(byte >> 4) & 0xF]
+    return crc
+
+def build_fit_file(track):
+    # Minimal FIT activity file : file_id message followed by one record message per track point
+    body = bytearray()
+    body += struct.pack("<BBBHB", 0x40, 0, 0, 0, 3) + bytes([0, 1, 0, 4, 4, 134, 1, 2, 132]) # definition : file_id (type, time_created, manufacturer)
+    body += struct.pack("<BBIH", 0x00, 4, int(track[0]["time"].timestamp()) - FIT_EPOCH_OFFSET if track else 0, 1)
+    body += struct.pack("<BBBHB", 0x41, 0, 0, 20, 7) + bytes([253, 4, 134, 0, 4, 133, 1, 4, 133, 2, 2, 132, 5, 4, 134, 6, 2, 132, 3, 1, 2]) # definition : record
+    for point in track:
+        body += struct.pack(
+            "<BIiiHIHB", 0x01,
+            int(point["time"].timestamp()) - FIT_EPOCH_OFFSET,
+            int(point["lat"] / (180 / 2**31)),
+            int(point["lon"] / (180 / 2**31)),
+            int((point["altitude"] + 500) * 5),
+            int(point["distance"] * 100),
+            int(point["speed"] * 1000),
+            point["heart_rate"],
+        )
+    header = struct.pack("<BBHI4s", 14, 0x20, 2132, len(body), b".FIT")
+    header += struct.pack("<H", fit_crc(header))
+    fit_data = header + bytes(body)
+    return fit_data + struct.pack("<H", fit_crc(fit_data))
+
+def build_tcx_file(activity, track):
+    trackpoints = "".join(
+        f"<Trackpoint><Time>{point['time'].strftime('%Y-%m-%dT%H:%M:%S.000Z')}</Time><Position><LatitudeDegrees>{point['lat']:.7f}</LatitudeDegrees><LongitudeDegrees>{point['lon']:.7f}</LongitudeDegrees></Position>"
+        f"<AltitudeMeters>{point['altitude']:.1f}</AltitudeMeters><DistanceMeters>{point['distance']:.1f}</DistanceMeters><HeartRateBpm><Value>{point['heart_rate']}</Value></HeartRateBpm>"
+        f"<Extensions><ns3:TPX><ns3:Speed>{point['speed']}</ns3:Speed></ns3:TPX></Extensions></Trackpoint>"
+        for point in track
+    )
+    start = activity["start"].strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><TrainingCenterDatabase xmlns="http://www.garmin.com/xmlschemas/TrainingCenterDatabase/v2" xmlns:ns3="http://www.garmin.com/xmlschemas/ActivityExtension/v2">'
+        f'<Activities><Activity Sport="Running"><Id>{start}</Id><Lap StartTime="{start}"><Track>{trackpoints}</Track></Lap></Activity></Activities></TrainingCenterDatabase>'
+    ).encode("UTF-8")
+
+# %%
+def user_summary(user, date_str, seed):
+    rng = day_rng(user, date_str, "summary", seed)
+    return {
+        "privacyProtected": False,
+        "calendarDate": date_str,
+        "wellnessStartTimeGmt": gmt_string(day_start(date_str)),
+        "activeKilocalories": rng.randint(200, 1200), "bmrKilocalories": rng.randint(1500, 1900),
+        "totalSteps": rng.randint(2000, 20000), "totalDistanceMeters": rng.randint(1500, 16000),
+        "highlyActiveSeconds": rng.randint(0, 5000), "activeSeconds": rng.randint(1000, 15000), "sedentarySeconds": rng.randint(30000, 50000), "sleepingSeconds": rng.randint(20000, 32000),
+        "moderateIntensityMinutes": rng.randint(0, 60), "vigorousIntensityMinutes": rng.randint(0, 60),
+        "floorsAscendedInMeters": rng.uniform(0, 60), "floorsDescendedInMeters": rng.uniform(0, 60), "floorsAscended": rng.uniform(0, 20), "floorsDescended": rng.uniform(0, 20),
+        "minHeartRate": rng.randint(42, 55), "maxHeartRate": rng.randint(120, 185), "restingHeartRate": rng.randint(48, 62), "minAvgHeartRate": rng.randint(45, 58), "maxAvgHeartRate": rng.randint(110, 170),
+        "stressDuration": rng.randint(10000, 30000), "restStressDuration": rng.randint(10000, 30000), "activityStressDuration": rng.randint(0, 10000), "uncategorizedStressDuration": rng.randint(0, 5000),
+        "totalStressDuration": 86400, "lowStressDuration": rng.randint(5000, 15000), "mediumStressDuration": rng.randint(1000, 8000), "highStressDuration": rng.randint(0, 3000),
+        "stressPercentage": rng.uniform(10, 40), "restStressPercentage": rng.uniform(20, 50), "activityStressPercentage": rng.uniform(0, 20), "uncategorizedStressPercentage": rng.uniform(0, 10),
+        "lowStressPercentage": rng.uniform(5, 20), "mediumStressPercentage": rng.uniform(2, 10), "highStressPercentage": rng.uniform(0, 5),
+        "bodyBatteryChargedValue": rng.randint(20, 80), "bodyBatteryDrainedValue": rng.randint(20, 80), "bodyBatteryHighestValue": rng.randint(60, 100), "bodyBatteryLowestValue": rng.randint(5, 40),
+        "bodyBatteryDuringSleep": rng.randint(20, 70), "bodyBatteryAtWakeTime": rng.randint(50, 100),
+        "averageSpo2": rng.randint(92, 99), "lowestSpo2": rng.randint(85, 94),
+    }
+
+def sleep_data(user, date_str, seed):
+    rng = day_rng(user, date_str, "sleep", seed)
+    sleep_start = day_start(date_str) - timedelta(hours=2, minutes=rng.randint(0, 60))
+    sleep_end = sleep_start + timedelta(hours=7, minutes=rng.randint(0, 90))
+    minutes = [sleep_start + timedelta(minutes=offset) for offset in range(int((sleep_end - sleep_start).total_seconds() // 60))]
+    return {
+        "dailySleepDTO": {
+            "sleepEndTimestampGMT": epoch_ms(sleep_end), "sleepTimeSeconds": len(minutes) * 60,
+            "deepSleepSeconds": rng.randint(3000, 7000), "lightSleepSeconds": rng.randint(10000, 16000), "remSleepSeconds": rng.randint(3000, 7000), "awakeSleepSeconds": rng.randint(0, 2000),
+            "averageSpO2Value": rng.randint(93, 98), "lowestSpO2Value": rng.randint(85, 92), "highestSpO2Value": 100,
+            "averageRespirationValue": rng.uniform(12, 16), "lowestRespirationValue": rng.uniform(9, 12), "highestRespirationValue": rng.uniform(16, 20),
+            "awakeCount": rng.randint(0, 4), "avgSleepStress": rng.uniform(10, 25), "sleepScores": {"overall": {"value": rng.randint(50, 95)}},
+        },
+        "restlessMomentsCount": rng.randint(10, 60), "avgOvernightHrv": rng.randint(30, 80), "bodyBatteryChange": rng.randint(20, 70), "restingHeartRate": rng.randint(45, 60),
+        "sleepMovement": [{"startGMT": gmt_string(minute), "endGMT": gmt_string(minute + timedelta(minutes=1)), "activityLevel": rng.uniform(0, 3)} for minute in minutes],
+        "sleepLevels": [{"startGMT": gmt_string(minutes[offset]), "endGMT": gmt_string(minutes[min(offset + 30, len(minutes) - 1)]), "activityLevel": float(rng.randint(0, 3))} for offset in range(0, len(minutes), 30)],
+        "sleepRestlessMoments": [{"startGMT": epoch_ms(minute), "value": 1} for minute in minutes[::17]],
+        "wellnessEpochSPO2DataDTOList": [{"epochTimestamp": gmt_string(minute), "spo2Reading": rng.randint(90, 99)} for minute in minutes],
+        "wellnessEpochRespirationDataDTOList": [{"startTimeGMT": epoch_ms(minute), "respirationValue": rng.uniform(11, 17)} for minute in minutes[::2]],
+        "sleepHeartRate": [{"startGMT": epoch_ms(minute), "value": rng.randint(45, 65)} for minute in minutes[::2]],
+        "sleepStress": [{"startGMT": epoch_ms(minute), "value": rng.randint(5, 30)} for minute in minutes[::3]],
+        "sleepBodyBattery": [{"startGMT": epoch_ms(minute), "value": min(100, 20 + offset // 6)} for offset, minute in enumerate(minutes[::3])],
+        "hrvData": [{"startGMT": epoch_ms(minute), "value": rng.randint(25, 90)} for minute in minutes[::5]],
+    }
+
+def activity_summary(activity, rng):
+    return {
+        "activityId": activity["id"], "deviceId": 3400000000, "activityName": f"Mock {activity['type'].title()}",
+        "activityType": {"typeKey": activity["type"]},
+        "startTimeGMT": activity["start"].strftime("%Y-%m-%d %H:%M:%S"), "startTimeLocal": activity["start"].strftime("%Y-%m-%d %H:%M:%S"),
+        "distance": activity["duration"] * 2.8, "elapsedDuration": float(activity["duration"]), "movingDuration": float(activity["duration"]),
+        "averageSpeed": 2.8, "maxSpeed": 4.1, "calories": rng.randint(150, 1200), "bmrCalories": rng.randint(20, 120), "averageHR": rng.randint(120, 160), "maxHR": rng.randint(160, 190),
+        "locationName": "Mockville", "lapCount": max(1, activity["duration"] // 600), "hasPolyline": True,
+        **{f"hrTimeInZone_{zone}": rng.uniform(0, activity["duration"] / 3) for zone in range(1, 6)},
+    }
+
+def daily_response(path, user, date_str, seed):
+    rng = day_rng(user, date_str, path, seed)
+    start = day_start(date_str)
+    activities = get_activities_for_date(user, date_str, seed)
+    if path.startswith("/usersummary-service/usersummary/daily/"):
+        return user_summary(user, date_str, seed)
+    if path.startswith("/wellness-service/wellness/dailySleepData/"):
+        return sleep_data(user, date_str, seed)
+    if path.startswith("/wellness-service/wellness/dailyHeartRate/"):
+        return {"heartRateValues": [[epoch_ms(start + timedelta(minutes=minute)), heart_rate_at(user, start + timedelta(minutes=minute), seed, activities)] for minute in range(0, 1440, 2)]}
+    if path.startswith("/wellness-service/wellness/dailySummaryChart/"):
+        return [{"startGMT": gmt_string(start + timedelta(minutes=minute)), "endGMT": gmt_string(start + timedelta(minutes=minute + 15)), "steps": rng.randint(0, 1500)} for minute in range(0, 1440, 15)]
+    if path.startswith("/wellness-service/wellness/dailyStress/"):
+        return {
+            "stressValuesArray": [[epoch_ms(start + timedelta(minutes=minute)), rng.choice([-1, rng.randint(0, 100)])] for minute in range(0, 1440, 3)],
+            "bodyBatteryValuesArray": [[epoch_ms(start + timedelta(minutes=minute)), "MEASURED", max(5, 100 - minute // 20), 2.0] for minute in range(0, 1440, 3)],
+        }
+    if path.startswith("/wellness-service/wellness/daily/respiration/"):
+        return {"respirationValuesArray": [[epoch_ms(start + timedelta(minutes=minute)), rng.uniform(10, 20)] for minute in range(0, 1440, 2)]}
+    if path.startswith("/hrv-service/hrv/"):
+        return {"hrvReadings": [{"hrvValue": rng.randint(25, 90), "readingTimeGMT": gmt_string(start - timedelta(hours=2) + timedelta(minutes=minute))} for minute in range(0, 420, 5)]}
+    if path.startswith("/weight-service/weight/range/"):
+        if rng.random() > 0.3:
+            return {"dailyWeightSummaries": []}
+        return {"dailyWeightSummaries": [{"allWeightMetrics": [{"timestampGMT": epoch_ms(start + timedelta(hours=7)), "weight": rng.uniform(70000, 72000), "bmi": rng.uniform(22, 23), "bodyFat": rng.uniform(15, 18), "bodyWater": rng.uniform(55, 60), "sourceType": "INDEX_SCALE"}]}]}
+    if path.startswith("/metrics-service/metrics/trainingreadiness/"):
+        return [{"timestamp": gmt_string(start + timedelta(hours=6)), "level": "MODERATE", "score": rng.randint(20, 95), "sleepScore": rng.randint(50, 95), "sleepScoreFactorPercent": rng.randint(50, 100), "recoveryTime": rng.randint(0, 3000), "recoveryTimeFactorPercent": rng.randint(50, 100), "acwrFactorPercent": rng.randint(50, 100), "acuteLoad": rng.randint(100, 800), "stressHistoryFactorPercent": rng.randint(50, 100), "hrvFactorPercent": rng.randint(50, 100)}]
+    if path.startswith("/metrics-service/metrics/hillscore/stats"):
+        return {"hillScoreDTOList": [{"strengthScore": rng.randint(20, 60), "enduranceScore": rng.randint(20, 60), "hillScoreClassificationId": 2, "overallScore": rng.randint(20, 60), "hillScoreFeedbackPhraseId": 1}]}
+    if path.startswith("/metrics-service/metrics/maxmet/daily/"):
+        return [{"generic": {"vo2MaxPreciseValue": round(48 + rng.uniform(-1, 1), 1)}}]
+    return None
+
+# %%
+class MockGarminHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logging.debug(format % args)
+
+    def send_payload(self, status, payload, content_type="application/json"):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+        with STATS_LOCK:
+            STATS["bytes_sent"] += len(body)
+
+    def do_GET(self):
+        config = self.server.config
+        parsed_url = urlparse(self.path)
+        path, params = parsed_url.path, {key: values[0] for key, values in parse_qs(parsed_url.query).items()}
+        if path == "/mock/stats":
+            with STATS_LOCK:
+                stats = {**STATS, "uptime_seconds": time.time() - STATS["started"]}
+            return self.send_payload(200, stats) # send_payload takes STATS_LOCK itself
+        with STATS_LOCK:
+            STATS["requests"] += 1
+            fault_roll, latency_roll = self.server.fault_rng.random(), self.server.fault_rng.random()
+        if config.latency_ms:
+            time.sleep(config.latency_ms / 1000 * (0.5 + latency_roll))
+        if fault_roll < config.error_rate_429:
+            with STATS_LOCK:
+                STATS["injected_429"] += 1
+            return self.send_payload(429, {"message": "Too Many Requests"})
+        if fault_roll < config.error_rate_429 + config.timeout_rate:
+            with STATS_LOCK:
+                STATS["injected_timeouts"] += 1
+            time.sleep(config.timeout_seconds)
+        authorization = self.headers.get("Authorization", "")
+        if not authorization.startswith("Bearer mock-user-"):
+            return self.send_payload(401, {"message": "Unauthorized"})
+        user = int(authorization.rsplit("-", 1)[-1])
+        try:
+            status, payload, content_type = self.route(path, params, user, config)
+        except (ValueError, IndexError) as err:
+            status, payload, content_type = 400, {"message": str(err)}, "application/json"
+        if status == 204:
+            self.send_response(204)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_payload(status, payload, content_type)
+
+    def in_history(self, date_str, config):
+        date = datetime.strptime(date_str, "%Y-%m-%d").date()
+        today = datetime.now(timezone.utc).date()
+        return today - timedelta(days=config.history_days) <= date <= today
+
+    def route(self, path, params, user, config):
+        display_name = f"mock-user-{user}"
+        if path in ["/userprofile-service/socialProfile", "/userprofile-service/userprofile/profile"]:
+            return 200, {"displayName": display_name, "fullName": f"Mock User {user}", "userName": display_name}, "application/json"
+        if path == "/userprofile-service/userprofile/user-settings":
+            return 200, {"userData": {"measurementSystem": "metric"}}, "application/json"
+        if path == "/device-service/deviceservice/mylastused":
+            now = datetime.now(timezone.utc)
+            last_sync = now - timedelta(minutes=now.minute % config.sync_interval_minutes, seconds=now.second, microseconds=now.microsecond)
+            return 200, {"lastUsedDeviceName": "Mock Forerunner", "lastUsedDeviceUploadTime": epoch_ms(last_sync), "imageUrl": "https://example.invalid/mock-device.png"}, "application/json"
+        if path.startswith("/metrics-service/metrics/racepredictions/latest/"):
+            return 200, {"time5K": 1500 + user, "time10K": 3150 + user, "timeHalfMarathon": 7000 + user, "timeMarathon": 14800 + user}, "application/json"
+        if path == "/activitylist-service/activities/search/activities":
+            start_index, limit = int(params.get("start", 0)), int(params.get("limit", 20))
+            if "startDate" in params:
+                end_date = params.get("endDate", params["startDate"])
+                date_list = [(datetime.strptime(params["startDate"], "%Y-%m-%d") + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range((datetime.strptime(end_date, "%Y-%m-%d") - datetime.strptime(params["startDate"], "%Y-%m-%d")).days + 1)]
+            else:
+                date_list = [(datetime.now(timezone.utc) - timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(0, 14)]
+            activities = [activity for date_str in date_list if self.in_history(date_str, config) for activity in get_activities_for_date(user, date_str, config.seed) if activity["start"] + timedelta(seconds=activity["duration"]) <= datetime.now(timezone.utc)]
+            return 200, [activity_summary(activity, day_rng(user, str(activity["id"]), "activity", config.seed)) for activity in activities][start_index:start_index + limit], "application/json"
+        if path.startswith("/download-service/files/activity/") or path.startswith("/download-service/export/tcx/activity/"):
+            activity = activity_from_id(user, path.rstrip("/").rsplit("/", 1)[-1], config.seed)
+            if not activity:
+                return 404, {"message": "Activity not found"}, "application/json"
+            track = activity_track(user, activity, config.seed)
+            if "/export/tcx/" in path:
+                return 200, build_tcx_file(activity, track), "application/xml"
+            zip_buffer = io.BytesIO()
+            with zipfile.ZipFile(zip_buffer, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+                zip_ref.writestr(f"{activity['id']}_ACTIVITY.fit", build_fit_file(track))
+            return 200, zip_buffer.getvalue(), "application/zip"
+        date_str = params.get("calendarDate") or params.get("date") or params.get("startDate") or next((segment for segment in path.split("/") if len(segment) == 10 and segment[4] == "-"), None)
+        if not date_str or not self.in_history(date_str, config):
+            return 204, None, None
+        payload = daily_response(path, user, date_str, config.seed)
+        if payload is None:
+            return 404, {"message": f"Endpoint {path} is not mocked"}, "application/json"
+        return 200, payload, "application/json"
+
+# %%
+def write_tokens(token_dir, user):
+    os.makedirs(token_dir, exist_ok=True)
+    far_future = int(time.time()) + 10 * 365 * 86400
+    with open(os.path.join(token_dir, "oauth1_token.json"), "w") as f:
+        json.dump({"oauth_token": f"mock-user-{user}", "oauth_token_secret": "mock", "mfa_token": None, "mfa_expiration_timestamp": None, "domain": "garmin.com"}, f)
+    with open(os.path.join(token_dir, "oauth2_token.json"), "w") as f:
+        json.dump({"scope": "mock", "jti": "mock", "token_type": "Bearer", "access_token": f"mock-user-{user}", "refresh_token": "mock", "expires_in": far_future - int(time.time()), "expires_at": far_future, "refresh_token_expires_in": far_future - int(time.time()), "refresh_token_expires_at": far_future}, f)
+    logging.info(f"Mock login tokens for synthetic user {user} written to '{token_dir}'")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local mock Garmin Connect API server for garmin-fetch.py soak and scale testing")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--seed", type=int, default=0, help="seed for the deterministic synthetic data")
+    parser.add_argument("--history-days", type=int, default=365, help="number of past days with synthetic data")
+    parser.add_argument("--sync-interval-minutes", type=int, default=30, help="simulated watch sync interval reported by the last used device endpoint")
+    parser.add_argument("--latency-ms", type=int, default=0, help="average added latency per request")
+    parser.add_argument("--error-rate-429", type=float, default=0.0, help="fraction of requests answered with 429 Too Many Requests")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="fraction of requests delayed by --timeout-seconds")
+    parser.add_argument("--timeout-seconds", type=float, default=15.0)
+    parser.add_argument("--write-tokens", metavar="TOKEN_DIR", help="write login tokens for --user into TOKEN_DIR and exit")
+    parser.add_argument("--user", type=int, default=1, help="synthetic user number used with --write-tokens")
+    args = parser.parse_args()
+
+    if args.write_tokens:
+        write_tokens(args.write_tokens, args.user)
+        sys.exit(0)
+
+    server = ThreadingHTTPServer((args.host, args.port), MockGarminHandler)
+    server.config = args
+    server.fault_rng = random.Random(args.seed)
+    logging.info(f"Mock Garmin Connect server listening on http://{args.host}:{args.port} with {args.history_days} days of synthetic history")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info(f"Stopped : {json.dumps(STATS)}")
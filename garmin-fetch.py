@@ -1,5 +1,6 @@
 # %%
-import base64, requests, time, pytz, logging, os, sys, dotenv, io, zipfile
+import base64, requests, time, pytz, logging, os, sys, dotenv, io, zipfile, uuid, sqlite3, threading, hashlib, re
+import numpy as np
 from fitparse import FitFile, FitParseError
 from datetime import datetime, timedelta
 from influxdb import InfluxDBClient
@@ -52,6 +53,33 @@ UPDATE_INTERVAL_SECONDS = int(os.getenv("UPDATE_INTERVAL_SECONDS", 300)) # optio
 FETCH_ADVANCED_TRAINING_DATA = True if os.getenv("FETCH_ADVANCED_TRAINING_DATA") in ['True', 'true', 'TRUE','t', 'T', 'yes', 'Yes', 'YES', '1'] else False # optional
 KEEP_FIT_FILES = True if os.getenv("KEEP_FIT_FILES") in ['True', 'true', 'TRUE','t', 'T', 'yes', 'Yes', 'YES', '1'] else False # optional
 FIT_FILE_STORAGE_LOCATION = os.getenv("FIT_FILE_STORAGE_LOCATION", os.path.join(os.path.expanduser("~"), "fit_filestore"))
+STATE_STORAGE_LOCATION = os.getenv("STATE_STORAGE_LOCATION", os.path.join(os.path.expanduser("~"), "garmin_state")) # optional, local state (job queue etc.) that should persist across restarts
+ACTIVITY_GPS_QUEUE = True if os.getenv("ACTIVITY_GPS_QUEUE") in ['True', 'true', 'TRUE','t', 'T', 'yes', 'Yes', 'YES', '1'] else False # optional, processes activity GPS files in background workers
+ACTIVITY_GPS_QUEUE_WORKERS = int(os.getenv("ACTIVITY_GPS_QUEUE_WORKERS", 1)) # optional
+ACTIVITY_GPS_QUEUE_MAX_ATTEMPTS = int(os.getenv("ACTIVITY_GPS_QUEUE_MAX_ATTEMPTS", 5)) # optional
+FIT_WATCH_FOLDER = os.getenv("FIT_WATCH_FOLDER", None) # optional, folder watched for local .fit activity files (USB mounted watch, Garmin data export)
+FIT_WATCH_POLL_SECONDS = int(os.getenv("FIT_WATCH_POLL_SECONDS", 60)) # optional
+GARMINCONNECT_MOCK_URL = os.getenv("GARMINCONNECT_MOCK_URL", None) # optional, base URL of Extra/mock-garmin-server.py for soak and scale testing
+ADAPTIVE_POLLING = True if os.getenv("ADAPTIVE_POLLING") in ['True', 'true', 'TRUE','t', 'T', 'yes', 'Yes', 'YES', '1'] else False # optional, learns watch sync pattern and replaces the fixed UPDATE_INTERVAL_SECONDS
+ADAPTIVE_POLLING_MIN_SECONDS = max(int(os.getenv("ADAPTIVE_POLLING_MIN_SECONDS", UPDATE_INTERVAL_SECONDS)), UPDATE_INTERVAL_SECONDS) # optional, never polls faster than UPDATE_INTERVAL_SECONDS
+ADAPTIVE_POLLING_MAX_SECONDS = max(int(os.getenv("ADAPTIVE_POLLING_MAX_SECONDS", 1800)), ADAPTIVE_POLLING_MIN_SECONDS) # optional
+ADAPTIVE_POLLING_HISTORY_DAYS = int(os.getenv("ADAPTIVE_POLLING_HISTORY_DAYS", 28)) # optional
+ADAPTIVE_POLLING_SYNC_RATIO = float(os.getenv("ADAPTIVE_POLLING_SYNC_RATIO", 0.2)) # optional, fraction of days a time slot must have seen a sync to be considered likely
+GAP_REPAIR_MODE = True if os.getenv("GAP_REPAIR_MODE") in ['True', 'true', 'TRUE','t', 'T', 'yes', 'Yes', 'YES', '1'] else False # optional, with MANUAL_START_DATE only re-fetches missing or incomplete days per measurement
+GAP_SCAN_MIN_COVERAGE = float(os.getenv("GAP_SCAN_MIN_COVERAGE", 0.5)) # optional, a day with fewer points than this fraction of the median daily count is treated as incomplete
+ACTIVITY_SCHEMA_MODE = os.getenv("ACTIVITY_SCHEMA_MODE", "legacy").lower() # optional, "compact" keeps ActivityID and ActivitySelector out of the tags to bound series cardinality
+MIGRATE_ACTIVITY_SCHEMA = True if os.getenv("MIGRATE_ACTIVITY_SCHEMA") in ['True', 'true', 'TRUE','t', 'T', 'yes', 'Yes', 'YES', '1'] else False # optional, one time rewrite of existing activity data to the compact schema
+MIGRATION_BATCH_SIZE = int(os.getenv("MIGRATION_BATCH_SIZE", 5000)) # optional
+ACTIVITY_SPATIAL_INDEX = True if os.getenv("ACTIVITY_SPATIAL_INDEX") in ['True', 'true', 'TRUE','t', 'T', 'yes', 'Yes', 'YES', '1'] else False # optional, writes a per activity bounding box and visited geohash tiles to ActivitySpatialIndex
+ACTIVITY_SPATIAL_INDEX_PRECISION = int(os.getenv("ACTIVITY_SPATIAL_INDEX_PRECISION", 6)) # optional, geohash length of the visited tiles (6 is roughly 1.2 km x 0.6 km)
+BUILD_ACTIVITY_SPATIAL_INDEX = True if os.getenv("BUILD_ACTIVITY_SPATIAL_INDEX") in ['True', 'true', 'TRUE','t', 'T', 'yes', 'Yes', 'YES', '1'] else False # optional, one time backfill of ActivitySpatialIndex from stored ActivityGPS data
+ACTIVITY_AREA_QUERY = os.getenv("ACTIVITY_AREA_QUERY", None) # optional, "min_lat,min_lon,max_lat,max_lon" - lists the activities intersecting this area and exits
+TRAINING_LOAD_ANALYTICS = True if os.getenv("TRAINING_LOAD_ANALYTICS") in ['True', 'true', 'TRUE','t', 'T', 'yes', 'Yes', 'YES', '1'] else False # optional, computes daily TRIMP, HR zones and acute/chronic load at ingest
+USER_MAX_HEART_RATE = int(os.getenv("USER_MAX_HEART_RATE", 190)) # optional, used for TRIMP and HR zones
+USER_RESTING_HEART_RATE = int(os.getenv("USER_RESTING_HEART_RATE")) if os.getenv("USER_RESTING_HEART_RATE") else None # optional, daily resting heart rate from Garmin is used if not given
+OUTPUT_SINKS = [sink.strip().lower() for sink in os.getenv("OUTPUT_SINKS", "influxdb").split(",") if sink.strip()] # optional, comma separated list of influxdb and parquet
+PARQUET_STORAGE_LOCATION = os.getenv("PARQUET_STORAGE_LOCATION", os.path.join(os.path.expanduser("~"), "parquet_store")) # optional
+PARQUET_COMPRESSION = os.getenv("PARQUET_COMPRESSION", "zstd") # optional
 PARSED_ACTIVITY_ID_LIST = []
 
 # %%
@@ -89,11 +117,23 @@ def iter_days(start_date: str, end_date: str):
         current -= timedelta(days=1)
 
 
+# %%
+def redirect_to_mock_server(garmin):
+    # Sends all Garmin Connect API requests to the local mock server instead of connectapi.garmin.com
+    session_request = garmin.garth.sess.request
+    def mock_request(method, url, *args, **kwargs):
+        return session_request(method, url.replace(f"https://connectapi.{garmin.garth.domain}", GARMINCONNECT_MOCK_URL.rstrip("/"), 1), *args, **kwargs)
+    garmin.garth.sess.request = mock_request
+    logging.warning(f"Garmin Connect API requests are redirected to mock server at {GARMINCONNECT_MOCK_URL}")
+    return garmin
+
 # %%
 def garmin_login():
     try:
         logging.info(f"Trying to login to Garmin Connect using token data from directory '{TOKEN_DIR}'...")
         garmin = Garmin()
+        if GARMINCONNECT_MOCK_URL:
+            redirect_to_mock_server(garmin)
         garmin.login(TOKEN_DIR)
         logging.info("login to Garmin Connect successful using stored session tokens.")
 
@@ -128,104 +168,395 @@ def garmin_login():
     return garmin
 
 # %%
-def write_points_to_influxdb(points):
-    try:
-        if len(points) != 0:
+class InfluxDBSink:
+    name = "influxdb"
+
+    def write(self, points):
+        try:
             influxdbclient.write_points(points)
             logging.info("Successfully updated influxdb database with new points")
-    except InfluxDBClientError as err:
-        logging.error("Unable to connect with database! " + str(err))
+            return True
+        except InfluxDBClientError as err:
+            logging.error("Unable to connect with database! " + str(err))
+            return False
+
+class ParquetSink:
+    # Writes columnar files partitioned as <location>/measurement=<name>/month=<YYYY-MM>/part-0.parquet (hive style)
+    # Each write merges the new points into the month partition field by field, so re-fetched days update their previous rows instead of piling up
+    name = "parquet"
+
+    def __init__(self, storage_location, compression):
+        try:
+            import pyarrow, pyarrow.parquet
+        except ImportError:
+            raise ImportError("pyarrow is required for the parquet output sink - install it with 'pip install pyarrow'")
+        self.pa, self.pq = pyarrow, pyarrow.parquet
+        self.storage_location = storage_location
+        self.compression = compression
+
+    def to_column(self, values):
+        # Numbers are always stored as float64 and everything else as string so the schema stays stable across files
+        present_values = [value for value in values if value is not None]
+        if all(isinstance(value, bool) for value in present_values):
+            return self.pa.array(values, type=self.pa.bool_())
+        if all(isinstance(value, (int, float)) and not isinstance(value, bool) for value in present_values):
+            return self.pa.array([None if value is None else float(value) for value in values], type=self.pa.float64())
+        return self.pa.array([None if value is None else str(value) for value in values], type=self.pa.string())
+
+    def merge_partition(self, partition_dir, new_table, tag_names):
+        # Upserts by (time, tags) merging field by field like InfluxDB (latest non-null value wins), then rewrites the whole month as a single file
+        existing_files = sorted(os.path.join(partition_dir, file_name) for file_name in os.listdir(partition_dir) if file_name.endswith(".parquet"))
+        tables = []
+        for file_path in existing_files:
+            table = self.pq.read_table(file_path)
+            tag_names = list(dict.fromkeys(tag_names + [name for name in (table.schema.metadata or {}).get(b"tags", b"").decode().split(",") if name]))
+            tables.append(table.replace_schema_metadata(None))
+        tables.append(new_table)
+        column_types = {}
+        for table in tables:
+            for field in table.schema:
+                column_types.setdefault(field.name, field.type)
+        try:
+            # columns keep the type they were first stored with in this partition
+            tables = [self.pa.table({name: table[name].cast(column_types[name]) for name in table.column_names}) for table in tables]
+            table = self.pa.concat_tables(tables, promote_options="default") if len(tables) > 1 else tables[0]
+        except self.pa.ArrowException as err:
+            logging.error(f"Skipping : parquet write to {partition_dir} - new points don't match the stored column types ({err})")
+            return None
+        key_columns = ["time"] + [name for name in tag_names if name in table.column_names]
+        value_columns = [name for name in table.column_names if name not in key_columns]
+        merged_table = table.group_by(key_columns, use_threads=False).aggregate([(name, "last") for name in value_columns]) # "last" skips nulls
+        table = merged_table.rename_columns([name[:-len("_last")] if name.endswith("_last") and name[:-len("_last")] in value_columns else name for name in merged_table.column_names])
+        table = table.select(key_columns + value_columns).sort_by("time")
+        table = table.replace_schema_metadata({"tags": ",".join(tag_names)})
+        partition_file = os.path.join(partition_dir, "part-0.parquet")
+        temp_file = os.path.join(partition_dir, f".part-0-{uuid.uuid4().hex[:8]}.tmp")
+        self.pq.write_table(table, temp_file, compression=self.compression)
+        os.replace(temp_file, partition_file)
+        for file_path in existing_files:
+            if file_path != partition_file:
+                os.remove(file_path)
+        return table.num_rows
+
+    def write(self, points):
+        all_written = True
+        partitions = {}
+        for point in points:
+            point_time = datetime.fromisoformat(point["time"])
+            point_time = point_time.replace(tzinfo=pytz.UTC) if point_time.tzinfo is None else point_time.astimezone(pytz.UTC)
+            partitions.setdefault((point["measurement"], point_time.strftime('%Y-%m')), []).append((point_time, point))
+        for (measurement, month), partition_points in partitions.items():
+            tag_names = list(dict.fromkeys(name for _, point in partition_points for name in point.get("tags", {})))
+            field_names = list(dict.fromkeys(name for _, point in partition_points for name in point["fields"]))
+            columns = {"time": self.pa.array([point_time for point_time, _ in partition_points], type=self.pa.timestamp("ms", tz="UTC"))}
+            for name in tag_names:
+                columns[name] = self.pa.array([None if point.get("tags", {}).get(name) is None else str(point["tags"][name]) for _, point in partition_points], type=self.pa.string())
+            for name in field_names:
+                values = [point["fields"].get(name) for _, point in partition_points]
+                if any(value is not None for value in values): # all-null fields are left out instead of guessing their type
+                    columns[name if name not in columns else "field_" + name] = self.to_column(values)
+            partition_dir = os.path.join(self.storage_location, f"measurement={measurement}", f"month={month}")
+            os.makedirs(partition_dir, exist_ok=True)
+            if self.merge_partition(partition_dir, self.pa.table(columns), tag_names) is None:
+                all_written = False
+        logging.info(f"Successfully written {len(points)} points to parquet store in {len(partitions)} partitions")
+        return all_written
+
+OUTPUT_SINK_FACTORIES = {
+    "influxdb": lambda: InfluxDBSink(),
+    "parquet": lambda: ParquetSink(PARQUET_STORAGE_LOCATION, PARQUET_COMPRESSION),
+}
+for sink in OUTPUT_SINKS:
+    if sink not in OUTPUT_SINK_FACTORIES:
+        raise ValueError(f"Unknown output sink '{sink}' in OUTPUT_SINKS - supported values are {', '.join(OUTPUT_SINK_FACTORIES)}")
+OUTPUT_SINK_LIST = [OUTPUT_SINK_FACTORIES[sink]() for sink in OUTPUT_SINKS]
+
+write_points_lock = threading.Lock() # background GPS workers and the FIT folder watcher write concurrently with the main loop
+
+def write_points(points): # returns False if any sink failed to store the points
+    if len(points) == 0:
+        return True
+    with write_points_lock:
+        return all([sink.write(points) for sink in OUTPUT_SINK_LIST]) # list, so every sink is written even after a failure
+
+def coalesce_points(points):
+    # Merges points sharing the same measurement, tag set and timestamp into a single multi field point (later non None values win)
+    coalesced_points = {}
+    for point in points:
+        point_key = (point["measurement"], tuple(sorted(point.get("tags", {}).items())), point["time"])
+        if point_key in coalesced_points:
+            coalesced_points[point_key]["fields"].update({key: value for key, value in point["fields"].items() if value is not None})
+        else:
+            coalesced_points[point_key] = {**point, "fields": dict(point["fields"])}
+    return list(coalesced_points.values())
+
+# %%
+# Declarative measurement schema : each entry describes where the records live in the Garmin JSON response,
+# how the timestamp is encoded, which fields/tags to extract and when a record should be skipped.
+# Field and tag specs are either a key ("key" or nested "key.subkey"), an array index (for list entries) or a callable(entry).
+# Time specs are (spec, format) tuples with format "gmt_string" / "epoch_ms", "date_noon" or a callable(entry, date_str).
+# The "Device" tag is always added with the current GARMIN_DEVICENAME.
+def _sleep_entry_seconds(entry):
+    return int((datetime.fromisoformat(entry["endGMT"]) - datetime.fromisoformat(entry["startGMT"])).total_seconds())
+
+def _body_composition_time(entry, date_str):
+    if entry['timestampGMT']:
+        return datetime.fromtimestamp(entry['timestampGMT']/1000, tz=pytz.UTC).isoformat()
+    return datetime.strptime(date_str, "%Y-%m-%d").replace(hour=12, tzinfo=pytz.UTC).isoformat() # Use GMT 12:00 is timestamp is not available (issue #15)
+
+def _activity_selector(activity):
+    return datetime.fromisoformat(activity["startTimeGMT"]).replace(tzinfo=pytz.UTC).strftime('%Y%m%dT%H%M%SUTC-') + activity.get('activityType',{}).get('typeKey', "Unknown")
+
+def _activity_end_time(activity, date_str):
+    return (datetime.fromisoformat(activity["startTimeGMT"]).replace(tzinfo=pytz.UTC) + timedelta(seconds=int(activity.get('elapsedDuration', 0)))).isoformat()
+
+MEASUREMENT_SCHEMA = {
+    "DailyStats": {
+        "measurement": "DailyStats",
+        "time": ("wellnessStartTimeGmt", "gmt_string"),
+        "require": "wellnessStartTimeGmt",
+        "fields": {name: name for name in [
+            "activeKilocalories", "bmrKilocalories", "totalSteps", "totalDistanceMeters",
+            "highlyActiveSeconds", "activeSeconds", "sedentarySeconds", "sleepingSeconds", "moderateIntensityMinutes", "vigorousIntensityMinutes",
+            "floorsAscendedInMeters", "floorsDescendedInMeters", "floorsAscended", "floorsDescended",
+            "minHeartRate", "maxHeartRate", "restingHeartRate", "minAvgHeartRate", "maxAvgHeartRate",
+            "stressDuration", "restStressDuration", "activityStressDuration", "uncategorizedStressDuration", "totalStressDuration", "lowStressDuration", "mediumStressDuration", "highStressDuration",
+            "stressPercentage", "restStressPercentage", "activityStressPercentage", "uncategorizedStressPercentage", "lowStressPercentage", "mediumStressPercentage", "highStressPercentage",
+            "bodyBatteryChargedValue", "bodyBatteryDrainedValue", "bodyBatteryHighestValue", "bodyBatteryLowestValue", "bodyBatteryDuringSleep", "bodyBatteryAtWakeTime",
+            "averageSpo2", "lowestSpo2",
+        ]}
+    },
+    "DeviceSync": {
+        "measurement": "DeviceSync",
+        "time": ("lastUsedDeviceUploadTime", "epoch_ms"),
+        "fields": {
+            "imageUrl": "imageUrl",
+            "Device": lambda entry: GARMIN_DEVICENAME
+        }
+    },
+    "SleepSummary": {
+        "measurement": "SleepSummary",
+        "time": ("dailySleepDTO.sleepEndTimestampGMT", "epoch_ms"),
+        "require": "dailySleepDTO.sleepEndTimestampGMT",
+        "fields": {
+            **{name: "dailySleepDTO." + name for name in [
+                "sleepTimeSeconds", "deepSleepSeconds", "lightSleepSeconds", "remSleepSeconds", "awakeSleepSeconds",
+                "averageSpO2Value", "lowestSpO2Value", "highestSpO2Value", "averageRespirationValue", "lowestRespirationValue", "highestRespirationValue",
+                "awakeCount", "avgSleepStress",
+            ]},
+            "sleepScore": "dailySleepDTO.sleepScores.overall.value",
+            "restlessMomentsCount": "restlessMomentsCount",
+            "avgOvernightHrv": "avgOvernightHrv",
+            "bodyBatteryChange": "bodyBatteryChange",
+            "restingHeartRate": "restingHeartRate"
+        }
+    },
+    "SleepMovement": {
+        "measurement": "SleepIntraday",
+        "records": "sleepMovement",
+        "time": ("startGMT", "gmt_string"),
+        "fields": {
+            "SleepMovementActivityLevel": lambda entry: entry.get("activityLevel", -1),
+            "SleepMovementActivitySeconds": _sleep_entry_seconds
+        }
+    },
+    "SleepLevels": {
+        "measurement": "SleepIntraday",
+        "records": "sleepLevels",
+        "time": ("startGMT", "gmt_string"),
+        "require": "activityLevel",
+        "fields": {
+            "SleepStageLevel": "activityLevel",
+            "SleepStageSeconds": _sleep_entry_seconds
+        }
+    },
+    "SleepRestlessMoments": {"measurement": "SleepIntraday", "records": "sleepRestlessMoments", "time": ("startGMT", "epoch_ms"), "require": "value", "fields": {"sleepRestlessValue": "value"}},
+    "SleepSpO2": {"measurement": "SleepIntraday", "records": "wellnessEpochSPO2DataDTOList", "time": ("epochTimestamp", "gmt_string"), "require": "spo2Reading", "fields": {"spo2Reading": "spo2Reading"}},
+    "SleepRespiration": {"measurement": "SleepIntraday", "records": "wellnessEpochRespirationDataDTOList", "time": ("startTimeGMT", "epoch_ms"), "require": "respirationValue", "fields": {"respirationValue": "respirationValue"}},
+    "SleepHeartRate": {"measurement": "SleepIntraday", "records": "sleepHeartRate", "time": ("startGMT", "epoch_ms"), "require": "value", "fields": {"heartRate": "value"}},
+    "SleepStress": {"measurement": "SleepIntraday", "records": "sleepStress", "time": ("startGMT", "epoch_ms"), "require": "value", "fields": {"stressValue": "value"}},
+    "SleepBodyBattery": {"measurement": "SleepIntraday", "records": "sleepBodyBattery", "time": ("startGMT", "epoch_ms"), "require": "value", "fields": {"bodyBattery": "value"}},
+    "SleepHRV": {"measurement": "SleepIntraday", "records": "hrvData", "time": ("startGMT", "epoch_ms"), "require": "value", "fields": {"hrvData": "value"}},
+    "HeartRateIntraday": {"measurement": "HeartRateIntraday", "records": "heartRateValues", "time": (0, "epoch_ms"), "require": 1, "fields": {"HeartRate": 1}},
+    "StepsIntraday": {"measurement": "StepsIntraday", "time": ("startGMT", "gmt_string"), "require_present": "steps", "fields": {"StepsCount": "steps"}},
+    "StressIntraday": {"measurement": "StressIntraday", "records": "stressValuesArray", "time": (0, "epoch_ms"), "require_present": 1, "fields": {"stressLevel": 1}},
+    "BodyBatteryIntraday": {"measurement": "BodyBatteryIntraday", "records": "bodyBatteryValuesArray", "time": (0, "epoch_ms"), "require_present": 2, "fields": {"BodyBatteryLevel": 2}},
+    "BreathingRateIntraday": {"measurement": "BreathingRateIntraday", "records": "respirationValuesArray", "time": (0, "epoch_ms"), "require": 1, "fields": {"BreathingRate": 1}},
+    "HRV_Intraday": {"measurement": "HRV_Intraday", "records": "hrvReadings", "time": ("readingTimeGMT", "gmt_string"), "require": "hrvValue", "fields": {"hrvValue": "hrvValue"}},
+    "BodyComposition": {
+        "measurement": "BodyComposition",
+        "time": _body_composition_time,
+        "skip_all_none": True,
+        "tags": {
+            "Frequency": lambda entry: "Intraday",
+            "SourceType": lambda entry: entry.get('sourceType', "Unknown")
+        },
+        "fields": {"weight": "weight", "bmi": "bmi", "bodyFat": "bodyFat", "bodyWater": "bodyWater"}
+    },
+    "ActivitySummary": {
+        "measurement": "ActivitySummary",
+        "time": ("startTimeGMT", "gmt_string"),
+        "require_present": "startTimeGMT", # "startTimeGMT" should be available for all activities (fix #13)
+        "fields": {
+            **{name: name for name in [
+                'activityId', 'deviceId', 'activityName'
+            ]},
+            'activityType': "activityType.typeKey",
+            **{name: name for name in [
+                'distance', 'elapsedDuration', 'movingDuration', 'averageSpeed', 'maxSpeed', 'calories', 'bmrCalories', 'averageHR', 'maxHR',
+                'locationName', 'lapCount', 'hrTimeInZone_1', 'hrTimeInZone_2', 'hrTimeInZone_3', 'hrTimeInZone_4', 'hrTimeInZone_5',
+            ]}
+        }
+    },
+    "ActivitySummaryEnd": {
+        "measurement": "ActivitySummary",
+        "time": _activity_end_time,
+        "require_present": "startTimeGMT",
+        "tags": {
+            "ActivityID": 'activityId',
+            "ActivitySelector": _activity_selector
+        },
+        "fields": {
+            'activityId': 'activityId',
+            'deviceId': 'deviceId',
+            'activityName': lambda entry: "END",
+            'activityType': lambda entry: "No Activity",
+        }
+    },
+    "ActivityIndex": { # one small point per activity, used as the activity selector in the compact activity schema
+        "measurement": "ActivityIndex",
+        "time": ("startTimeGMT", "gmt_string"),
+        "require_present": "startTimeGMT",
+        "fields": {
+            "ActivityID": 'activityId',
+            "ActivitySelector": _activity_selector,
+            "activityType": "activityType.typeKey",
+            "activityName": 'activityName',
+            "hasGPS": lambda entry: bool(entry.get('hasPolyline'))
+        }
+    },
+    "TrainingReadiness": {
+        "measurement": "TrainingReadiness",
+        "time": ("timestamp", "gmt_string"),
+        "require": "timestamp",
+        "skip_all_none": True,
+        "fields": {name: name for name in [
+            "level", "score", "sleepScore", "sleepScoreFactorPercent", "recoveryTime", "recoveryTimeFactorPercent",
+            "acwrFactorPercent", "acuteLoad", "stressHistoryFactorPercent", "hrvFactorPercent",
+        ]}
+    },
+    "HillScore": {
+        "measurement": "HillScore",
+        "records": "hillScoreDTOList",
+        "time": "date_noon", # Use GMT 12:00 for daily record
+        "skip_all_none": True,
+        "fields": {name: name for name in ["strengthScore", "enduranceScore", "hillScoreClassificationId", "overallScore", "hillScoreFeedbackPhraseId"]}
+    },
+    "RacePredictions": {
+        "measurement": "RacePredictions",
+        "time": "date_noon", # Use GMT 12:00 for daily record
+        "skip_all_none": True,
+        "fields": {name: name for name in ["time5K", "time10K", "timeHalfMarathon", "timeMarathon"]}
+    },
+    "VO2_Max": {
+        "measurement": "VO2_Max",
+        "time": "date_noon", # Use GMT 12:00 for daily record
+        "require": "generic.vo2MaxPreciseValue",
+        "fields": {"VO2_max_value": "generic.vo2MaxPreciseValue"}
+    },
+}
+
+# %%
+TIME_PARSERS = {
+    "gmt_string": lambda value: datetime.fromisoformat(value).replace(tzinfo=pytz.UTC).isoformat(),
+    "epoch_ms": lambda value: datetime.fromtimestamp(value/1000, tz=pytz.UTC).isoformat(),
+}
+
+def compile_getter(spec):
+    if callable(spec):
+        return spec
+    if isinstance(spec, int):
+        return lambda entry: entry[spec]
+    keys = spec.split(".")
+    if len(keys) == 1:
+        return lambda entry: entry.get(spec)
+    def nested_getter(entry):
+        for key in keys:
+            entry = (entry or {}).get(key)
+        return entry
+    return nested_getter
+
+def compile_time_getter(spec):
+    if callable(spec):
+        return spec
+    if spec == "date_noon":
+        return lambda entry, date_str: datetime.strptime(date_str, "%Y-%m-%d").replace(hour=12, tzinfo=pytz.UTC).isoformat()
+    value_getter, time_parser = compile_getter(spec[0]), TIME_PARSERS[spec[1]]
+    return lambda entry, date_str: time_parser(value_getter(entry))
+
+def compile_measurement_schema(schema):
+    measurement = schema["measurement"]
+    records_getter = compile_getter(schema["records"]) if schema.get("records") is not None else None
+    time_getter = compile_time_getter(schema["time"])
+    field_getters = tuple((name, compile_getter(spec)) for name, spec in schema["fields"].items())
+    tag_getters = tuple((name, compile_getter(spec)) for name, spec in schema.get("tags", {}).items())
+    require_getter = compile_getter(schema["require"]) if schema.get("require") is not None else None
+    require_present_getter = compile_getter(schema["require_present"]) if schema.get("require_present") is not None else None
+    skip_all_none = schema.get("skip_all_none", False)
+
+    def extractor(source, date_str=None):
+        points_list = []
+        if not source:
+            return points_list
+        if records_getter:
+            records = records_getter(source) or []
+        elif isinstance(source, list):
+            records = source
+        else:
+            records = [source]
+        device_name = GARMIN_DEVICENAME
+        for entry in records:
+            if require_getter and not require_getter(entry):
+                continue
+            if require_present_getter and require_present_getter(entry) is None:
+                continue
+            fields = {name: getter(entry) for name, getter in field_getters}
+            if skip_all_none and all(value is None for value in fields.values()):
+                continue
+            tags = {"Device": device_name}
+            for name, getter in tag_getters:
+                tags[name] = getter(entry)
+            points_list.append({
+                "measurement": measurement,
+                "time": time_getter(entry, date_str),
+                "tags": tags,
+                "fields": fields
+            })
+        return points_list
+    return extractor
+
+MEASUREMENT_EXTRACTORS = {name: compile_measurement_schema(schema) for name, schema in MEASUREMENT_SCHEMA.items()}
 
 # %%
 def get_daily_stats(date_str):
-    points_list = []
     stats_json = garmin_obj.get_stats(date_str)
     if stats_json['wellnessStartTimeGmt'] and datetime.strptime(date_str, "%Y-%m-%d") < datetime.today():
-        points_list.append({
-            "measurement":  "DailyStats",
-            "time": pytz.timezone("UTC").localize(datetime.strptime(stats_json['wellnessStartTimeGmt'], "%Y-%m-%dT%H:%M:%S.%f")).isoformat(),
-            "tags": {
-                "Device": GARMIN_DEVICENAME
-            },
-            "fields": {
-                "activeKilocalories": stats_json.get('activeKilocalories'),
-                "bmrKilocalories": stats_json.get('bmrKilocalories'),
-
-                'totalSteps': stats_json.get('totalSteps'),
-                'totalDistanceMeters': stats_json.get('totalDistanceMeters'),
-
-                "highlyActiveSeconds": stats_json.get("highlyActiveSeconds"),
-                "activeSeconds": stats_json.get("activeSeconds"),
-                "sedentarySeconds": stats_json.get("sedentarySeconds"),
-                "sleepingSeconds": stats_json.get("sleepingSeconds"),
-                "moderateIntensityMinutes": stats_json.get("moderateIntensityMinutes"),
-                "vigorousIntensityMinutes": stats_json.get("vigorousIntensityMinutes"),
-
-                "floorsAscendedInMeters": stats_json.get("floorsAscendedInMeters"),
-                "floorsDescendedInMeters": stats_json.get("floorsDescendedInMeters"),
-                "floorsAscended": stats_json.get("floorsAscended"),
-                "floorsDescended": stats_json.get("floorsDescended"),
-
-                "minHeartRate": stats_json.get("minHeartRate"),
-                "maxHeartRate": stats_json.get("maxHeartRate"),
-                "restingHeartRate": stats_json.get("restingHeartRate"),
-                "minAvgHeartRate": stats_json.get("minAvgHeartRate"),
-                "maxAvgHeartRate": stats_json.get("maxAvgHeartRate"),
-                
-                "stressDuration": stats_json.get("stressDuration"),
-                "restStressDuration": stats_json.get("restStressDuration"),
-                "activityStressDuration": stats_json.get("activityStressDuration"),
-                "uncategorizedStressDuration": stats_json.get("uncategorizedStressDuration"),
-                "totalStressDuration": stats_json.get("totalStressDuration"),
-                "lowStressDuration": stats_json.get("lowStressDuration"),
-                "mediumStressDuration": stats_json.get("mediumStressDuration"),
-                "highStressDuration": stats_json.get("highStressDuration"),
-                
-                "stressPercentage": stats_json.get("stressPercentage"),
-                "restStressPercentage": stats_json.get("restStressPercentage"),
-                "activityStressPercentage": stats_json.get("activityStressPercentage"),
-                "uncategorizedStressPercentage": stats_json.get("uncategorizedStressPercentage"),
-                "lowStressPercentage": stats_json.get("lowStressPercentage"),
-                "mediumStressPercentage": stats_json.get("mediumStressPercentage"),
-                "highStressPercentage": stats_json.get("highStressPercentage"),
-                
-                "bodyBatteryChargedValue": stats_json.get("bodyBatteryChargedValue"),
-                "bodyBatteryDrainedValue": stats_json.get("bodyBatteryDrainedValue"),
-                "bodyBatteryHighestValue": stats_json.get("bodyBatteryHighestValue"),
-                "bodyBatteryLowestValue": stats_json.get("bodyBatteryLowestValue"),
-                "bodyBatteryDuringSleep": stats_json.get("bodyBatteryDuringSleep"),
-                "bodyBatteryAtWakeTime": stats_json.get("bodyBatteryAtWakeTime"),
-                
-                "averageSpo2": stats_json.get("averageSpo2"),
-                "lowestSpo2": stats_json.get("lowestSpo2"),
-            }
-        })
+        points_list = MEASUREMENT_EXTRACTORS["DailyStats"](stats_json, date_str)
         if points_list:
             logging.info(f"Success : Fetching daily matrices for date {date_str}")
         return points_list
     else:
         logging.debug("No daily stat data available for the give date " + date_str)
         return []
-    
+
 
 # %%
 def get_last_sync():
     global GARMIN_DEVICENAME
-    points_list = []
     sync_data = garmin_obj.get_device_last_used()
     if GARMIN_DEVICENAME_AUTOMATIC:
         GARMIN_DEVICENAME = sync_data.get('lastUsedDeviceName') or "Unknown"
-    points_list.append({
-        "measurement":  "DeviceSync",
-        "time": datetime.fromtimestamp(sync_data['lastUsedDeviceUploadTime']/1000, tz=pytz.timezone("UTC")).isoformat(),
-        "tags": {
-            "Device": GARMIN_DEVICENAME
-        },
-        "fields": {
-            "imageUrl": sync_data.get('imageUrl'),
-            "Device": GARMIN_DEVICENAME
-        }
-    })
+    points_list = MEASUREMENT_EXTRACTORS["DeviceSync"](sync_data)
     if points_list:
         logging.info(f"Success : Updated device last sync time")
     else:
@@ -236,275 +567,45 @@ def get_last_sync():
 def get_sleep_data(date_str):
     points_list = []
     all_sleep_data = garmin_obj.get_sleep_data(date_str)
-    sleep_json = all_sleep_data.get("dailySleepDTO", None)
-    if sleep_json["sleepEndTimestampGMT"]:
-        points_list.append({
-        "measurement":  "SleepSummary",
-        "time": datetime.fromtimestamp(sleep_json["sleepEndTimestampGMT"]/1000, tz=pytz.timezone("UTC")).isoformat(),
-        "tags": {
-            "Device": GARMIN_DEVICENAME
-            },
-        "fields": {
-            "sleepTimeSeconds": sleep_json.get("sleepTimeSeconds"),
-            "deepSleepSeconds": sleep_json.get("deepSleepSeconds"),
-            "lightSleepSeconds": sleep_json.get("lightSleepSeconds"),
-            "remSleepSeconds": sleep_json.get("remSleepSeconds"),
-            "awakeSleepSeconds": sleep_json.get("awakeSleepSeconds"),
-            "averageSpO2Value": sleep_json.get("averageSpO2Value"),
-            "lowestSpO2Value": sleep_json.get("lowestSpO2Value"),
-            "highestSpO2Value": sleep_json.get("highestSpO2Value"),
-            "averageRespirationValue": sleep_json.get("averageRespirationValue"),
-            "lowestRespirationValue": sleep_json.get("lowestRespirationValue"),
-            "highestRespirationValue": sleep_json.get("highestRespirationValue"),
-            "awakeCount": sleep_json.get("awakeCount"),
-            "avgSleepStress": sleep_json.get("avgSleepStress"),
-            "sleepScore": sleep_json.get("sleepScores", {}).get("overall", {}).get("value"),
-            "restlessMomentsCount": all_sleep_data.get("restlessMomentsCount"),
-            "avgOvernightHrv": all_sleep_data.get("avgOvernightHrv"),
-            "bodyBatteryChange": all_sleep_data.get("bodyBatteryChange"),
-            "restingHeartRate": all_sleep_data.get("restingHeartRate")
-            }
-        })
-    sleep_movement_intraday = all_sleep_data.get("sleepMovement")
-    if sleep_movement_intraday:
-        for entry in sleep_movement_intraday:
-            points_list.append({
-                "measurement":  "SleepIntraday",
-                "time": pytz.timezone("UTC").localize(datetime.strptime(entry["startGMT"], "%Y-%m-%dT%H:%M:%S.%f")).isoformat(),
-                "tags": {
-                    "Device": GARMIN_DEVICENAME
-                },
-                "fields": {
-                    "SleepMovementActivityLevel": entry.get("activityLevel",-1),
-                    "SleepMovementActivitySeconds": int((datetime.strptime(entry["endGMT"], "%Y-%m-%dT%H:%M:%S.%f") - datetime.strptime(entry["startGMT"], "%Y-%m-%dT%H:%M:%S.%f")).total_seconds())
-                }
-            })
-    sleep_levels_intraday = all_sleep_data.get("sleepLevels")
-    if sleep_levels_intraday:
-        for entry in sleep_levels_intraday:
-            if entry.get("activityLevel"):
-                points_list.append({
-                    "measurement":  "SleepIntraday",
-                    "time": pytz.timezone("UTC").localize(datetime.strptime(entry["startGMT"], "%Y-%m-%dT%H:%M:%S.%f")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME
-                    },
-                    "fields": {
-                        "SleepStageLevel": entry.get("activityLevel"),
-                        "SleepStageSeconds": int((datetime.strptime(entry["endGMT"], "%Y-%m-%dT%H:%M:%S.%f") - datetime.strptime(entry["startGMT"], "%Y-%m-%dT%H:%M:%S.%f")).total_seconds())
-                    }
-                })
-    sleep_restlessness_intraday = all_sleep_data.get("sleepRestlessMoments")
-    if sleep_restlessness_intraday:
-        for entry in sleep_restlessness_intraday:
-            if entry.get("value"):
-                points_list.append({
-                    "measurement":  "SleepIntraday",
-                    "time": datetime.fromtimestamp(entry["startGMT"]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME
-                    },
-                    "fields": {
-                        "sleepRestlessValue": entry.get("value")
-                    }
-                })
-    sleep_spo2_intraday = all_sleep_data.get("wellnessEpochSPO2DataDTOList")
-    if sleep_spo2_intraday:
-        for entry in sleep_spo2_intraday:
-            if entry.get("spo2Reading"):
-                points_list.append({
-                    "measurement":  "SleepIntraday",
-                    "time": pytz.timezone("UTC").localize(datetime.strptime(entry["epochTimestamp"], "%Y-%m-%dT%H:%M:%S.%f")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME
-                    },
-                    "fields": {
-                        "spo2Reading": entry.get("spo2Reading")
-                    }
-                })
-    sleep_respiration_intraday = all_sleep_data.get("wellnessEpochRespirationDataDTOList")
-    if sleep_respiration_intraday:
-        for entry in sleep_respiration_intraday:
-            if entry.get("respirationValue"):
-                points_list.append({
-                    "measurement":  "SleepIntraday",
-                    "time": datetime.fromtimestamp(entry["startTimeGMT"]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME
-                    },
-                    "fields": {
-                        "respirationValue": entry.get("respirationValue")
-                    }
-                })
-    sleep_heart_rate_intraday = all_sleep_data.get("sleepHeartRate")
-    if sleep_heart_rate_intraday:
-        for entry in sleep_heart_rate_intraday:
-            if entry.get("value"):
-                points_list.append({
-                    "measurement":  "SleepIntraday",
-                    "time": datetime.fromtimestamp(entry["startGMT"]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME
-                    },
-                    "fields": {
-                        "heartRate": entry.get("value")
-                    }
-                })
-    sleep_stress_intraday = all_sleep_data.get("sleepStress")
-    if sleep_stress_intraday:
-        for entry in sleep_stress_intraday:
-            if entry.get("value"):
-                points_list.append({
-                    "measurement":  "SleepIntraday",
-                    "time": datetime.fromtimestamp(entry["startGMT"]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME
-                    },
-                    "fields": {
-                        "stressValue": entry.get("value")
-                    }
-                })
-    sleep_bb_intraday = all_sleep_data.get("sleepBodyBattery")
-    if sleep_bb_intraday:
-        for entry in sleep_bb_intraday:
-            if entry.get("value"):
-                points_list.append({
-                    "measurement":  "SleepIntraday",
-                    "time": datetime.fromtimestamp(entry["startGMT"]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME
-                    },
-                    "fields": {
-                        "bodyBattery": entry.get("value")
-                    }
-                })
-    sleep_hrv_intraday = all_sleep_data.get("hrvData")
-    if sleep_hrv_intraday:
-        for entry in sleep_hrv_intraday:
-            if entry.get("value"):
-                points_list.append({
-                    "measurement":  "SleepIntraday",
-                    "time": datetime.fromtimestamp(entry["startGMT"]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME
-                    },
-                    "fields": {
-                        "hrvData": entry.get("value")
-                    }
-                })
+    for schema_name in ["SleepSummary", "SleepMovement", "SleepLevels", "SleepRestlessMoments", "SleepSpO2", "SleepRespiration", "SleepHeartRate", "SleepStress", "SleepBodyBattery", "SleepHRV"]:
+        points_list.extend(MEASUREMENT_EXTRACTORS[schema_name](all_sleep_data, date_str))
+    points_list = coalesce_points(points_list)
     if points_list:
         logging.info(f"Success : Fetching intraday sleep matrices for date {date_str}")
     return points_list
 
 # %%
 def get_intraday_hr(date_str):
-    points_list = []
-    hr_list = garmin_obj.get_heart_rates(date_str).get("heartRateValues") or []
-    for entry in hr_list:
-        if entry[1]:
-            points_list.append({
-                    "measurement":  "HeartRateIntraday",
-                    "time": datetime.fromtimestamp(entry[0]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME
-                    },
-                    "fields": {
-                        "HeartRate": entry[1]
-                    }
-                })
+    points_list = MEASUREMENT_EXTRACTORS["HeartRateIntraday"](garmin_obj.get_heart_rates(date_str), date_str)
     if points_list:
         logging.info(f"Success : Fetching intraday Heart Rate for date {date_str}")
     return points_list
 
 # %%
 def get_intraday_steps(date_str):
-    points_list = []
-    steps_list = garmin_obj.get_steps_data(date_str)
-    for entry in steps_list:
-        if entry["steps"] or entry["steps"] == 0:
-            points_list.append({
-                    "measurement":  "StepsIntraday",
-                    "time": pytz.timezone("UTC").localize(datetime.strptime(entry['startGMT'], "%Y-%m-%dT%H:%M:%S.%f")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME
-                    },
-                    "fields": {
-                        "StepsCount": entry["steps"]
-                    }
-                })
+    points_list = MEASUREMENT_EXTRACTORS["StepsIntraday"](garmin_obj.get_steps_data(date_str), date_str)
     if points_list:
         logging.info(f"Success : Fetching intraday steps for date {date_str}")
     return points_list
 
 # %%
 def get_intraday_stress(date_str):
-    points_list = []
-    stress_list = garmin_obj.get_stress_data(date_str).get('stressValuesArray') or []
-    for entry in stress_list:
-        if entry[1] or entry[1] == 0:
-            points_list.append({
-                    "measurement":  "StressIntraday",
-                    "time": datetime.fromtimestamp(entry[0]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME
-                    },
-                    "fields": {
-                        "stressLevel": entry[1]
-                    }
-                })
-    bb_list = garmin_obj.get_stress_data(date_str).get('bodyBatteryValuesArray') or []
-    for entry in bb_list:
-        if entry[2] or entry[2] == 0:
-            points_list.append({
-                    "measurement":  "BodyBatteryIntraday",
-                    "time": datetime.fromtimestamp(entry[0]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME
-                    },
-                    "fields": {
-                        "BodyBatteryLevel": entry[2]
-                    }
-                })
+    stress_json = garmin_obj.get_stress_data(date_str)
+    points_list = MEASUREMENT_EXTRACTORS["StressIntraday"](stress_json, date_str) + MEASUREMENT_EXTRACTORS["BodyBatteryIntraday"](stress_json, date_str)
     if points_list:
         logging.info(f"Success : Fetching intraday stress and Body Battery values for date {date_str}")
     return points_list
 
 # %%
 def get_intraday_br(date_str):
-    points_list = []
-    br_list = garmin_obj.get_respiration_data(date_str).get('respirationValuesArray') or []
-    for entry in br_list:
-        if entry[1]:
-            points_list.append({
-                    "measurement":  "BreathingRateIntraday",
-                    "time": datetime.fromtimestamp(entry[0]/1000, tz=pytz.timezone("UTC")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME
-                    },
-                    "fields": {
-                        "BreathingRate": entry[1]
-                    }
-                })
+    points_list = MEASUREMENT_EXTRACTORS["BreathingRateIntraday"](garmin_obj.get_respiration_data(date_str), date_str)
     if points_list:
         logging.info(f"Success : Fetching intraday Breathing Rate for date {date_str}")
     return points_list
 
 # %%
 def get_intraday_hrv(date_str):
-    points_list = []
-    hrv_list = (garmin_obj.get_hrv_data(date_str) or {}).get('hrvReadings') or []
-    for entry in hrv_list:
-        if entry.get('hrvValue'):
-            points_list.append({
-                    "measurement":  "HRV_Intraday",
-                    "time": pytz.timezone("UTC").localize(datetime.strptime(entry['readingTimeGMT'],"%Y-%m-%dT%H:%M:%S.%f")).isoformat(),
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME
-                    },
-                    "fields": {
-                        "hrvValue": entry.get('hrvValue')
-                    }
-                })
+    points_list = MEASUREMENT_EXTRACTORS["HRV_Intraday"](garmin_obj.get_hrv_data(date_str), date_str)
     if points_list:
         logging.info(f"Success : Fetching intraday HRV for date {date_str}")
     return points_list
@@ -514,25 +615,7 @@ def get_body_composition(date_str):
     points_list = []
     weight_list_all = garmin_obj.get_weigh_ins(date_str, date_str).get('dailyWeightSummaries', [])
     if weight_list_all:
-        weight_list = weight_list_all[0].get('allWeightMetrics', [])
-        for weight_dict in weight_list:
-            data_fields = {
-                    "weight": weight_dict.get("weight"),
-                    "bmi": weight_dict.get("bmi"),
-                    "bodyFat": weight_dict.get("bodyFat"),
-                    "bodyWater": weight_dict.get("bodyWater"),
-                }
-            if not all(value is None for value in data_fields.values()):
-                points_list.append({
-                    "measurement":  "BodyComposition",
-                    "time": datetime.fromtimestamp((weight_dict['timestampGMT']/1000) , tz=pytz.timezone("UTC")).isoformat() if weight_dict['timestampGMT'] else datetime.strptime(date_str, "%Y-%m-%d").replace(hour=12, tzinfo=pytz.UTC).isoformat(), # Use GMT 12:00 is timestamp is not available (issue #15)
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                        "Frequency" : "Intraday",
-                        "SourceType" : weight_dict.get('sourceType', "Unknown")
-                    },
-                    "fields": data_fields
-                })
+        points_list = MEASUREMENT_EXTRACTORS["BodyComposition"](weight_list_all[0].get('allWeightMetrics', []), date_str)
         logging.info(f"Success : Fetching intraday Body Composition (Weight, BMI etc) for date {date_str}")
     return points_list
 
@@ -543,56 +626,143 @@ def get_activity_summary(date_str):
     activity_list = garmin_obj.get_activities_by_date(date_str, date_str)
     for activity in activity_list:
         if activity.get('hasPolyline'):
-            activity_with_gps_id_dict[activity.get('activityId')] = activity.get('activityType',{}).get('typeKey', "Unknown")
+            if reconcile_local_fit_activity(activity):
+                logging.info(f"Skipping : GPS data for activity ID {activity.get('activityId')} has already been ingested from a local FIT file")
+            else:
+                activity_with_gps_id_dict[activity.get('activityId')] = activity.get('activityType',{}).get('typeKey', "Unknown")
         if "startTimeGMT" in activity: # "startTimeGMT" should be available for all activities (fix #13)
-            points_list.append({
-                "measurement":  "ActivitySummary",
-                "time": datetime.strptime(activity["startTimeGMT"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=pytz.UTC).isoformat(),
-                "tags": {
-                    "Device": GARMIN_DEVICENAME
-                },
-                "fields": {
-                    'activityId': activity.get('activityId'),
-                    'deviceId': activity.get('deviceId'),
-                    'activityName': activity.get('activityName'),
-                    'activityType': activity.get('activityType',{}).get('typeKey',None),
-                    'distance': activity.get('distance'),
-                    'elapsedDuration': activity.get('elapsedDuration'),
-                    'movingDuration': activity.get('movingDuration'),
-                    'averageSpeed': activity.get('averageSpeed'),
-                    'maxSpeed': activity.get('maxSpeed'),
-                    'calories': activity.get('calories'),
-                    'bmrCalories': activity.get('bmrCalories'),
-                    'averageHR': activity.get('averageHR'),
-                    'maxHR': activity.get('maxHR'),
-                    'locationName': activity.get('locationName'),
-                    'lapCount': activity.get('lapCount'),
-                    'hrTimeInZone_1': activity.get('hrTimeInZone_1'),
-                    'hrTimeInZone_2': activity.get('hrTimeInZone_2'),
-                    'hrTimeInZone_3': activity.get('hrTimeInZone_3'),
-                    'hrTimeInZone_4': activity.get('hrTimeInZone_4'),
-                    'hrTimeInZone_5': activity.get('hrTimeInZone_5'),
-                }
-            })
-            points_list.append({
-                "measurement":  "ActivitySummary",
-                "time": (datetime.strptime(activity["startTimeGMT"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=pytz.UTC) + timedelta(seconds=int(activity.get('elapsedDuration', 0)))).isoformat(),
+            points_list.extend(MEASUREMENT_EXTRACTORS["ActivitySummary"](activity, date_str))
+            points_list.extend(MEASUREMENT_EXTRACTORS["ActivitySummaryEnd"](activity, date_str))
+            if ACTIVITY_SCHEMA_MODE == "compact":
+                points_list.extend(MEASUREMENT_EXTRACTORS["ActivityIndex"](activity, date_str))
+            logging.info(f"Success : Fetching Activity summary with id {activity.get('activityId')} for date {date_str}")
+        else:
+            logging.warning(f"Skipped : Start Timestamp missing for activity id {activity.get('activityId')} for date {date_str}")
+    if ACTIVITY_SCHEMA_MODE == "compact":
+        points_list = [compact_activity_point(point) for point in points_list]
+    return points_list, activity_with_gps_id_dict
+
+# %%
+def compact_activity_point(point):
+    # Moves the per-activity identity out of the tags so every activity doesn't create new series
+    if "ActivityID" in point["tags"] or "ActivitySelector" in point["tags"]:
+        point["tags"] = dict(point["tags"])
+        for key in ["ActivityID", "ActivitySelector"]:
+            if key in point["tags"]:
+                point["fields"][key] = point["tags"].pop(key)
+    return point
+
+# %%
+def activity_gps_points_from_fit(fitfile, activityID, activity_type):
+    points_list = []
+    all_records_list = [record.get_values() for record in fitfile.get_messages('record')]
+    activity_start_time = all_records_list[0]['timestamp'].replace(tzinfo=pytz.UTC)
+    for parsed_record in all_records_list:
+        if parsed_record.get('timestamp'):
+            point = {
+                "measurement": "ActivityGPS",
+                "time": parsed_record['timestamp'].replace(tzinfo=pytz.UTC).isoformat(), 
                 "tags": {
                     "Device": GARMIN_DEVICENAME,
-                    "ActivityID": activity.get('activityId'),
-                    "ActivitySelector": datetime.strptime(activity["startTimeGMT"], "%Y-%m-%d %H:%M:%S").replace(tzinfo=pytz.UTC).strftime('%Y%m%dT%H%M%SUTC-') + activity.get('activityType',{}).get('typeKey', "Unknown")
+                    "ActivityID": activityID,
+                    "ActivitySelector": activity_start_time.strftime('%Y%m%dT%H%M%SUTC-') + activity_type
                 },
                 "fields": {
-                    'activityId': activity.get('activityId'),
-                    'deviceId': activity.get('deviceId'),
-                    'activityName': "END",
-                    'activityType': "No Activity",
+                    "ActivityName": activity_type,
+                    "ActivityID": activityID,
+                    "Latitude": int(parsed_record['position_lat']) * ( 180 / 2**31 ) if parsed_record.get('position_lat') else None,
+                    "Longitude": int(parsed_record['position_long']) * ( 180 / 2**31 ) if parsed_record.get('position_long') else None,
+                    "Altitude": parsed_record.get('enhanced_altitude', None) or parsed_record.get('altitude', None),
+                    "Distance": parsed_record.get('distance', None),
+                    "HeartRate": float(parsed_record.get('heart_rate', None)) if parsed_record.get('heart_rate', None) else None,
+                    "Speed": parsed_record.get('enhanced_speed', None) or parsed_record.get('speed', None),
+                    "Cadence": parsed_record.get('cadence', None),
+                    "Fractional_Cadence": parsed_record.get('fractional_cadence', None),
+                    "Temperature": parsed_record.get('temperature', None),
+                    "Accumulated_Power": parsed_record.get('accumulated_power', None),
+                    "Power": parsed_record.get('power', None)
                 }
-            })
-            logging.info(f"Success : Fetching Activity summary with id {activity.get('activityId')} for date {date_str}")
+            }
+            points_list.append(point)
+    return points_list, activity_start_time
+
+# %%
+# Geohash helpers for the per activity spatial index (no external dependency)
+GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def geohash_encode(latitude, longitude, precision):
+    latitude_range, longitude_range = [-90.0, 90.0], [-180.0, 180.0]
+    geohash, bits, bit_count, is_longitude_bit = [], 0, 0, True
+    while len(geohash) < precision:
+        value_range, value = (longitude_range, longitude) if is_longitude_bit else (latitude_range, latitude)
+        mid = (value_range[0] + value_range[1]) / 2
+        if value >= mid:
+            bits, value_range[0] = bits * 2 + 1, mid
         else:
-            logging.warning(f"Skipped : Start Timestamp missing for activity id {activity.get('activityId')} for date {date_str}")
-    return points_list, activity_with_gps_id_dict
+            bits, value_range[1] = bits * 2, mid
+        is_longitude_bit = not is_longitude_bit
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(GEOHASH_BASE32[bits])
+            bits, bit_count = 0, 0
+    return "".join(geohash)
+
+def geohash_bounds(geohash): # returns (min_latitude, min_longitude, max_latitude, max_longitude)
+    latitude_range, longitude_range = [-90.0, 90.0], [-180.0, 180.0]
+    is_longitude_bit = True
+    for char in geohash:
+        bits = GEOHASH_BASE32.index(char)
+        for shift in range(4, -1, -1):
+            value_range = longitude_range if is_longitude_bit else latitude_range
+            mid = (value_range[0] + value_range[1]) / 2
+            if (bits >> shift) & 1:
+                value_range[0] = mid
+            else:
+                value_range[1] = mid
+            is_longitude_bit = not is_longitude_bit
+    return latitude_range[0], longitude_range[0], latitude_range[1], longitude_range[1]
+
+def get_activity_spatial_index(gps_points_list):
+    activity_tracks = {}
+    for point in gps_points_list:
+        if point["measurement"] == "ActivityGPS" and point["fields"].get("Latitude") is not None and point["fields"].get("Longitude") is not None:
+            activity_tracks.setdefault(point["fields"]["ActivityID"], []).append(point)
+    points_list = []
+    for activityID, track in activity_tracks.items():
+        latitudes = [point["fields"]["Latitude"] for point in track]
+        longitudes = [point["fields"]["Longitude"] for point in track]
+        geohash_tiles = sorted({geohash_encode(latitude, longitude, ACTIVITY_SPATIAL_INDEX_PRECISION) for latitude, longitude in zip(latitudes, longitudes)})
+        points_list.append({
+            "measurement": "ActivitySpatialIndex",
+            "time": track[0]["time"],
+            "tags": {"Device": track[0]["tags"].get("Device", GARMIN_DEVICENAME)},
+            "fields": {
+                "ActivityID": activityID,
+                "ActivitySelector": track[0]["tags"].get("ActivitySelector") or track[0]["fields"].get("ActivitySelector"),
+                "minLatitude": min(latitudes),
+                "maxLatitude": max(latitudes),
+                "minLongitude": min(longitudes),
+                "maxLongitude": max(longitudes),
+                "startGeohash": geohash_encode(latitudes[0], longitudes[0], 8),
+                "endGeohash": geohash_encode(latitudes[-1], longitudes[-1], 8),
+                "geohashTiles": ",".join(geohash_tiles),
+                "geohashTileCount": len(geohash_tiles),
+                "gpsPointCount": len(track)
+            }
+        })
+    return points_list
+
+def find_activities_in_area(min_latitude, min_longitude, max_latitude, max_longitude):
+    # Coarse bounding box filter in InfluxDB, then refined with the visited geohash tiles (matches at tile resolution)
+    query = f'SELECT "ActivityID", "ActivitySelector", "geohashTiles" FROM "ActivitySpatialIndex" WHERE "minLatitude" <= {max_latitude} AND "maxLatitude" >= {min_latitude} AND "minLongitude" <= {max_longitude} AND "maxLongitude" >= {min_longitude}'
+    matching_activities = []
+    for row in influxdbclient.query(query).get_points():
+        for geohash_tile in row["geohashTiles"].split(","):
+            tile_min_latitude, tile_min_longitude, tile_max_latitude, tile_max_longitude = geohash_bounds(geohash_tile)
+            if tile_min_latitude <= max_latitude and tile_max_latitude >= min_latitude and tile_min_longitude <= max_longitude and tile_max_longitude >= min_longitude:
+                matching_activities.append({"time": row["time"], "ActivityID": row["ActivityID"], "ActivitySelector": row["ActivitySelector"]})
+                break
+    return matching_activities
 
 # %%
 def fetch_activity_GPS(activityIDdict): # Uses FIT file by default, falls back to TCX
@@ -602,6 +772,9 @@ def fetch_activity_GPS(activityIDdict): # Uses FIT file by default, falls back t
         if activityID in PARSED_ACTIVITY_ID_LIST:
             logging.info(f"Skipping : Activity ID {activityID} has already been processed within current runtime")
             return []
+        if is_activity_ingested_locally(activityID):
+            logging.info(f"Skipping : Activity ID {activityID} has already been ingested from a local FIT file")
+            continue
         try:
             logging.info(f"Processing : Activity ID {activityID} GPS data from fit file - this may take a while...")
             zip_data = garmin_obj.download_activity(activityID, dl_fmt=garmin_obj.ActivityDownloadFormat.ORIGINAL)
@@ -612,38 +785,10 @@ def fetch_activity_GPS(activityIDdict): # Uses FIT file by default, falls back t
                     raise FileNotFoundError("No FIT file found in the downloaded zip archive.")
                 else:
                     fit_data = zip_ref.read(fit_filename)
-                    fit_file_buffer = io.BytesIO(fit_data)
-                    fitfile = FitFile(fit_file_buffer)
+                    fitfile = FitFile(io.BytesIO(fit_data))
                     fitfile.parse()
-                    all_records_list = [record.get_values() for record in fitfile.get_messages('record')]
-                    activity_start_time = all_records_list[0]['timestamp'].replace(tzinfo=pytz.UTC)
-                    for parsed_record in all_records_list:
-                        if parsed_record.get('timestamp'):
-                            point = {
-                                "measurement": "ActivityGPS",
-                                "time": parsed_record['timestamp'].replace(tzinfo=pytz.UTC).isoformat(), 
-                                "tags": {
-                                    "Device": GARMIN_DEVICENAME,
-                                    "ActivityID": activityID,
-                                    "ActivitySelector": activity_start_time.strftime('%Y%m%dT%H%M%SUTC-') + activity_type
-                                },
-                                "fields": {
-                                    "ActivityName": activity_type,
-                                    "ActivityID": activityID,
-                                    "Latitude": int(parsed_record['position_lat']) * ( 180 / 2**31 ) if parsed_record.get('position_lat') else None,
-                                    "Longitude": int(parsed_record['position_long']) * ( 180 / 2**31 ) if parsed_record.get('position_long') else None,
-                                    "Altitude": parsed_record.get('enhanced_altitude', None) or parsed_record.get('altitude', None),
-                                    "Distance": parsed_record.get('distance', None),
-                                    "HeartRate": float(parsed_record.get('heart_rate', None)) if parsed_record.get('heart_rate', None) else None,
-                                    "Speed": parsed_record.get('enhanced_speed', None) or parsed_record.get('speed', None),
-                                    "Cadence": parsed_record.get('cadence', None),
-                                    "Fractional_Cadence": parsed_record.get('fractional_cadence', None),
-                                    "Temperature": parsed_record.get('temperature', None),
-                                    "Accumulated_Power": parsed_record.get('accumulated_power', None),
-                                    "Power": parsed_record.get('power', None)
-                                }
-                            }
-                            points_list.append(point)
+                    fit_points_list, activity_start_time = activity_gps_points_from_fit(fitfile, activityID, activity_type)
+                    points_list.extend(fit_points_list)
                     if KEEP_FIT_FILES:
                         os.makedirs(FIT_FILE_STORAGE_LOCATION, exist_ok=True)
                         fit_path = os.path.join(FIT_FILE_STORAGE_LOCATION, activity_start_time.strftime('%Y%m%dT%H%M%SUTC-') + activity_type + ".fit")
@@ -656,6 +801,8 @@ def fetch_activity_GPS(activityIDdict): # Uses FIT file by default, falls back t
             try:
                 root = ET.fromstring(garmin_obj.download_activity(activityID, dl_fmt=garmin_obj.ActivityDownloadFormat.TCX).decode("UTF-8"))
             except requests.exceptions.Timeout as err:
+                if ACTIVITY_GPS_QUEUE: # let the background queue retry the job
+                    raise
                 logging.warning(f"Request timeout for fetching large activity record {activityID} - skipping record")
                 return []
             root = ET.fromstring(garmin_obj.download_activity(activityID, dl_fmt=garmin_obj.ActivityDownloadFormat.TCX).decode("UTF-8"))
@@ -712,6 +859,10 @@ def fetch_activity_GPS(activityIDdict): # Uses FIT file by default, falls back t
                     lap_index += 1
         logging.info(f"Success : Fetching GPS details for activity with activity id {activityID}")
         PARSED_ACTIVITY_ID_LIST.append(activityID)
+    if ACTIVITY_SCHEMA_MODE == "compact":
+        points_list = [compact_activity_point(point) for point in points_list]
+    if ACTIVITY_SPATIAL_INDEX:
+        points_list.extend(get_activity_spatial_index(points_list))
     return points_list
 
 # Contribution from PR #17 by @arturgoms 
@@ -719,28 +870,7 @@ def get_training_readiness(date_str):
     points_list = []
     tr_list_all = garmin_obj.get_training_readiness(date_str)
     if tr_list_all:
-        for tr_dict in tr_list_all:
-            data_fields = {
-                    "level": tr_dict.get("level"),
-                    "score": tr_dict.get("score"),
-                    "sleepScore": tr_dict.get("sleepScore"),
-                    "sleepScoreFactorPercent": tr_dict.get("sleepScoreFactorPercent"),
-                    "recoveryTime": tr_dict.get("recoveryTime"),
-                    "recoveryTimeFactorPercent": tr_dict.get("recoveryTimeFactorPercent"),
-                    "acwrFactorPercent": tr_dict.get("acwrFactorPercent"),
-                    "acuteLoad": tr_dict.get("acuteLoad"),
-                    "stressHistoryFactorPercent": tr_dict.get("stressHistoryFactorPercent"),
-                    "hrvFactorPercent": tr_dict.get("hrvFactorPercent"),
-                }
-            if (not all(value is None for value in data_fields.values())) and tr_dict.get('timestamp'):
-                points_list.append({
-                    "measurement":  "TrainingReadiness",
-                    "time": pytz.timezone("UTC").localize(datetime.strptime(tr_dict['timestamp'],"%Y-%m-%dT%H:%M:%S.%f")).isoformat(), # Use GMT 12:00 for daily record
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME
-                    },
-                    "fields": data_fields
-                })
+        points_list = MEASUREMENT_EXTRACTORS["TrainingReadiness"](tr_list_all, date_str)
         logging.info(f"Success : Fetching Training Readiness for date {date_str}")
     return points_list
 
@@ -749,23 +879,7 @@ def get_hillscore(date_str):
     points_list = []
     hill_all = garmin_obj.get_hill_score(date_str, date_str)
     if hill_all:
-        for hill in hill_all.get("hillScoreDTOList",[]):
-            data_fields = {
-                "strengthScore": hill.get("strengthScore"),
-                "enduranceScore": hill.get("enduranceScore"),
-                "hillScoreClassificationId": hill.get("hillScoreClassificationId"),
-                "overallScore": hill.get("overallScore"),
-                "hillScoreFeedbackPhraseId": hill.get("hillScoreFeedbackPhraseId")
-            }
-            if not all(value is None for value in data_fields.values()):
-                points_list.append({
-                    "measurement":  "HillScore",
-                    "time": datetime.strptime(date_str,"%Y-%m-%d").replace(hour=12, tzinfo=pytz.UTC).isoformat(), # Use GMT 12:00 for daily record
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                    },
-                    "fields": data_fields
-                })
+        points_list = MEASUREMENT_EXTRACTORS["HillScore"](hill_all, date_str)
         logging.info(f"Success : Fetching Hill Score for date {date_str}")
     return points_list
 
@@ -774,21 +888,7 @@ def get_race_predictions(date_str):
     points_list = []
     rp_all = garmin_obj.get_race_predictions()
     if rp_all:
-        data_fields = {
-            "time5K": rp_all.get("time5K"),
-            "time10K": rp_all.get("time10K"),
-            "timeHalfMarathon": rp_all.get("timeHalfMarathon"),
-            "timeMarathon": rp_all.get("timeMarathon"),
-        }
-        if not all(value is None for value in data_fields.values()):
-            points_list.append({
-                "measurement":  "RacePredictions",
-                "time": datetime.strptime(date_str,"%Y-%m-%d").replace(hour=12, tzinfo=pytz.UTC).isoformat(), # Use GMT 12:00 for daily record
-                "tags": {
-                    "Device": GARMIN_DEVICENAME,
-                },
-                "fields": data_fields
-            })
+        points_list = MEASUREMENT_EXTRACTORS["RacePredictions"](rp_all, date_str)
         logging.info(f"Success : Fetching Race Predictions for date {date_str}")
     return points_list
 
@@ -797,86 +897,659 @@ def get_vo2_max(date_str):
     max_metrics = garmin_obj.get_max_metrics(date_str)
     try:
         if max_metrics:
-            vo2_max_value = max_metrics[0].get("generic", {}).get("vo2MaxPreciseValue")
-            if vo2_max_value:
-                points_list.append({
-                    "measurement":  "VO2_Max",
-                    "time": datetime.strptime(date_str,"%Y-%m-%d").replace(hour=12, tzinfo=pytz.UTC).isoformat(), # Use GMT 12:00 for daily record
-                    "tags": {
-                        "Device": GARMIN_DEVICENAME,
-                    },
-                    "fields": {"VO2_max_value" : vo2_max_value}
-                })
+            points_list = MEASUREMENT_EXTRACTORS["VO2_Max"](max_metrics[0], date_str)
+            if points_list:
                 logging.info(f"Success : Fetching VO2-max for date {date_str}")
         return points_list
     except AttributeError as err:
         return []
 # %%
+# Persistent activity GPS job queue : activities are queued by get_activity_summary's GPS dict and processed by background workers,
+# so the daily metrics don't wait for large FIT/TCX downloads. Jobs survive restarts and are retried with backoff.
+activity_gps_queue_lock = threading.Lock()
+activity_gps_queue_event = threading.Event()
+activity_gps_queue_db = None
+
+def open_activity_gps_queue():
+    global activity_gps_queue_db
+    os.makedirs(STATE_STORAGE_LOCATION, exist_ok=True)
+    activity_gps_queue_db = sqlite3.connect(os.path.join(STATE_STORAGE_LOCATION, "activity_gps_queue.db"), check_same_thread=False)
+    with activity_gps_queue_lock, activity_gps_queue_db:
+        activity_gps_queue_db.execute("CREATE TABLE IF NOT EXISTS gps_jobs (activity_id INTEGER PRIMARY KEY, activity_type TEXT, priority INTEGER, status TEXT, attempts INTEGER DEFAULT 0, next_attempt_at REAL DEFAULT 0, last_error TEXT, updated_at REAL)")
+        activity_gps_queue_db.execute("UPDATE gps_jobs SET status = 'pending' WHERE status = 'running'") # jobs interrupted by a restart
+
+def enqueue_activity_gps_jobs(activityIDdict):
+    queued_count = 0
+    with activity_gps_queue_lock, activity_gps_queue_db:
+        for activityID, activity_type in activityIDdict.items():
+            # newest activities first, already queued or completed activities are not added again
+            queued_count += activity_gps_queue_db.execute("INSERT OR IGNORE INTO gps_jobs (activity_id, activity_type, priority, status, updated_at) VALUES (?, ?, ?, 'pending', ?)", (activityID, activity_type, -int(activityID), time.time())).rowcount
+    if queued_count:
+        logging.info(f"Queued : {queued_count} activities for background GPS processing")
+        activity_gps_queue_event.set()
+
+def claim_activity_gps_job():
+    with activity_gps_queue_lock, activity_gps_queue_db:
+        job = activity_gps_queue_db.execute("SELECT activity_id, activity_type, attempts FROM gps_jobs WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY priority LIMIT 1", (time.time(),)).fetchone()
+        if job:
+            activity_gps_queue_db.execute("UPDATE gps_jobs SET status = 'running', updated_at = ? WHERE activity_id = ?", (time.time(), job[0]))
+        return job
+
+def finish_activity_gps_job(activityID, attempts, error=None, retry_after_seconds=0):
+    with activity_gps_queue_lock, activity_gps_queue_db:
+        if error is None:
+            activity_gps_queue_db.execute("UPDATE gps_jobs SET status = 'done', attempts = ?, last_error = NULL, updated_at = ? WHERE activity_id = ?", (attempts, time.time(), activityID))
+        else:
+            status = 'failed' if attempts >= ACTIVITY_GPS_QUEUE_MAX_ATTEMPTS else 'pending'
+            activity_gps_queue_db.execute("UPDATE gps_jobs SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ? WHERE activity_id = ?", (status, attempts, time.time() + retry_after_seconds, str(error), time.time(), activityID))
+
+def pending_activity_gps_job_count():
+    with activity_gps_queue_lock:
+        return activity_gps_queue_db.execute("SELECT COUNT(*) FROM gps_jobs WHERE status IN ('pending', 'running')").fetchone()[0]
+
+def activity_gps_worker():
+    while True:
+        job = claim_activity_gps_job()
+        if not job:
+            activity_gps_queue_event.wait(timeout=30)
+            activity_gps_queue_event.clear()
+            continue
+        activityID, activity_type, attempts = job
+        try:
+            activity_gps_points_list = fetch_activity_GPS({activityID: activity_type})
+            write_points(activity_gps_points_list)
+            finish_activity_gps_job(activityID, attempts + 1)
+        except GarminConnectTooManyRequestsError as err:
+            logging.error(err)
+            logging.info(f"Too many requests (429) : GPS job for activity ID {activityID} will be retried after {FETCH_FAILED_WAIT_SECONDS} seconds")
+            finish_activity_gps_job(activityID, attempts, err, FETCH_FAILED_WAIT_SECONDS) # rate limits don't count as failed attempts
+        except Exception as err:
+            retry_after_seconds = RATE_LIMIT_CALLS_SECONDS * 2 ** (attempts + 1)
+            logging.error(f"Failed : GPS job for activity ID {activityID} (attempt {attempts + 1} of {ACTIVITY_GPS_QUEUE_MAX_ATTEMPTS}) - {err}")
+            finish_activity_gps_job(activityID, attempts + 1, err, retry_after_seconds)
+        else:
+            if TRAINING_LOAD_ANALYTICS:
+                try:
+                    update_training_load_for_activity(activity_gps_points_list)
+                except Exception as err:
+                    logging.error(f"Failed : Unable to update training load after GPS job for activity ID {activityID} - {err}")
+        time.sleep(RATE_LIMIT_CALLS_SECONDS)
+
+def start_activity_gps_workers():
+    open_activity_gps_queue()
+    for worker_index in range(ACTIVITY_GPS_QUEUE_WORKERS):
+        threading.Thread(target=activity_gps_worker, name=f"activity-gps-worker-{worker_index}", daemon=True).start()
+    logging.info(f"Started {ACTIVITY_GPS_QUEUE_WORKERS} background activity GPS worker(s) with {pending_activity_gps_job_count()} queued jobs")
+
+def wait_for_activity_gps_queue():
+    while (pending_jobs := pending_activity_gps_job_count()):
+        logging.info(f"Waiting : for {pending_jobs} queued activity GPS jobs to finish")
+        activity_gps_queue_event.set()
+        time.sleep(30)
+
+# %%
+# Local FIT drop folder : new .fit files are detected by polling (file size and modification time are cached, so unchanged files are not re-read),
+# deduplicated by SHA-256 and written through the same ActivityGPS pipeline. Ingested activity IDs are skipped by the API path.
+fit_ingest_lock = threading.Lock()
+fit_ingest_db = None
+fit_folder_seen_files = {}
+
+def open_fit_ingest_db():
+    global fit_ingest_db
+    os.makedirs(STATE_STORAGE_LOCATION, exist_ok=True)
+    fit_ingest_db = sqlite3.connect(os.path.join(STATE_STORAGE_LOCATION, "fit_ingest.db"), check_same_thread=False)
+    with fit_ingest_lock, fit_ingest_db:
+        fit_ingest_db.execute("CREATE TABLE IF NOT EXISTS ingested_fit_files (sha256 TEXT PRIMARY KEY, file_path TEXT, activity_id INTEGER, activity_start REAL, activity_type TEXT, activity_selector TEXT, ingested_at REAL)")
+        existing_columns = [column[1] for column in fit_ingest_db.execute("PRAGMA table_info(ingested_fit_files)")]
+        for column_name, column_type in [("activity_start", "REAL"), ("activity_type", "TEXT"), ("activity_selector", "TEXT")]: # state files from earlier versions
+            if column_name not in existing_columns:
+                fit_ingest_db.execute(f"ALTER TABLE ingested_fit_files ADD COLUMN {column_name} {column_type}")
+        fit_ingest_db.execute("CREATE INDEX IF NOT EXISTS ingested_fit_files_activity_id ON ingested_fit_files (activity_id)")
+        fit_ingest_db.execute("CREATE INDEX IF NOT EXISTS ingested_fit_files_activity_start ON ingested_fit_files (activity_start)")
+
+def find_local_fit_activity(activityID, start_time_GMT=None):
+    # Local files rarely carry the Garmin Connect activity ID, so activities are also matched by their start time (within 2 seconds)
+    if fit_ingest_db is None:
+        return None
+    activity_start = datetime.fromisoformat(start_time_GMT).replace(tzinfo=pytz.UTC).timestamp() if start_time_GMT else None
+    columns = "sha256, file_path, activity_id, activity_type, activity_selector"
+    with fit_ingest_lock:
+        local_activity = fit_ingest_db.execute(f"SELECT {columns} FROM ingested_fit_files WHERE activity_id = ? LIMIT 1", (int(activityID),)).fetchone()
+        if local_activity is None and activity_start is not None:
+            local_activity = fit_ingest_db.execute(f"SELECT {columns} FROM ingested_fit_files WHERE activity_start BETWEEN ? AND ? LIMIT 1", (activity_start - 2, activity_start + 2)).fetchone()
+        return local_activity
+
+def is_activity_ingested_locally(activityID, start_time_GMT=None):
+    return find_local_fit_activity(activityID, start_time_GMT) is not None
+
+def remove_local_fit_activity_points(activityID, activity_selector):
+    if ACTIVITY_SCHEMA_MODE == "compact":
+        # GPS points share their series and timestamps with the re-written ones, only the local ActivityIndex entry must go
+        if activity_selector:
+            index_time = datetime.strptime(activity_selector.split("UTC-", 1)[0], '%Y%m%dT%H%M%S').replace(tzinfo=pytz.UTC)
+            influxdbclient.query(f"DELETE FROM \"ActivityIndex\" WHERE time = '{index_time.strftime('%Y-%m-%dT%H:%M:%SZ')}'")
+    else:
+        influxdbclient.query(f'DROP SERIES FROM "ActivityGPS" WHERE "ActivityID" = \'{activityID}\'')
+
+def reconcile_local_fit_activity(activity):
+    # Files imported before Garmin Connect knew the activity carry a placeholder ID (the start time) and the FIT sport name,
+    # they are re-written with the Garmin Connect activity ID and type once the activity summary is fetched
+    local_activity = find_local_fit_activity(activity.get('activityId'), activity.get('startTimeGMT'))
+    if local_activity is None:
+        return False
+    file_hash, file_path, local_activityID, local_activity_type, local_activity_selector = local_activity
+    activityID, activity_type = int(activity.get('activityId')), activity.get('activityType',{}).get('typeKey', "Unknown")
+    if local_activityID == activityID and local_activity_type == activity_type:
+        return True
+    remove_local_fit_activity_points(local_activityID, local_activity_selector)
+    try:
+        with open(file_path, "rb") as f:
+            fit_data = f.read()
+    except OSError:
+        logging.warning(f"Local FIT file {file_path} is no longer available - GPS data for activity ID {activityID} will be fetched from Garmin Connect")
+        with fit_ingest_lock, fit_ingest_db:
+            fit_ingest_db.execute("DELETE FROM ingested_fit_files WHERE sha256 = ?", (file_hash,))
+        return False
+    _, _, activity_selector, points_list = ingest_fit_file(file_path, fit_data, activityID, activity_type)
+    if write_points(points_list): # otherwise the old record is kept and the activity is re-written on the next fetch
+        with fit_ingest_lock, fit_ingest_db:
+            fit_ingest_db.execute("UPDATE ingested_fit_files SET activity_id = ?, activity_type = ?, activity_selector = ? WHERE sha256 = ?", (activityID, activity_type, activity_selector, file_hash))
+        logging.info(f"Success : Re-written local FIT file {file_path} GPS data with Garmin Connect activity ID {activityID} ({activity_type})")
+    return True
+
+def find_stored_activity(activity_start_time):
+    # Garmin Connect activity ID and type of an already fetched activity starting at the same time (within 2 seconds)
+    time_filter = f"time >= '{(activity_start_time - timedelta(seconds=2)).strftime('%Y-%m-%dT%H:%M:%SZ')}' AND time <= '{(activity_start_time + timedelta(seconds=2)).strftime('%Y-%m-%dT%H:%M:%SZ')}'"
+    stored_activities = list(influxdbclient.query(f'SELECT "activityId", "activityType" FROM "ActivitySummary" WHERE {time_filter} AND "activityName" != \'END\'').get_points())
+    if stored_activities and stored_activities[0].get("activityId"):
+        return int(stored_activities[0]["activityId"]), stored_activities[0].get("activityType") or "Unknown"
+    return None, None
+
+def ingest_fit_file(file_path, fit_data, activityID=None, activity_type=None):
+    fitfile = FitFile(io.BytesIO(fit_data))
+    fitfile.parse()
+    session_message = next(fitfile.get_messages('session'), None)
+    first_record = next(fitfile.get_messages('record'))
+    activity_start_time = ((session_message.get_value('start_time') if session_message else None) or first_record.get_value('timestamp')).replace(tzinfo=pytz.UTC)
+    known_activity = activityID is not None # given when re-writing a file for an activity fetched from Garmin Connect
+    if not known_activity:
+        # Only the Garmin Connect "Export Original" name (12345678901_ACTIVITY.fit) carries the activity ID, otherwise it is looked up by start time
+        id_match = re.match(r"^(\d+)_ACTIVITY\.fit$", os.path.basename(file_path), re.IGNORECASE)
+        stored_activityID, stored_activity_type = find_stored_activity(activity_start_time)
+        known_activity = stored_activityID is not None
+        activityID = int(id_match.group(1)) if id_match else stored_activityID or int(activity_start_time.timestamp())
+        sport_message = next(fitfile.get_messages('sport'), None) or session_message
+        activity_type = stored_activity_type or (str(sport_message.get_value('sport')) if sport_message and sport_message.get_value('sport') else "Unknown")
+    points_list, _ = activity_gps_points_from_fit(fitfile, activityID, activity_type)
+    activity_selector = points_list[0]["tags"]["ActivitySelector"]
+    if ACTIVITY_SCHEMA_MODE == "compact":
+        if not known_activity: # activities fetched from Garmin Connect already have their ActivityIndex entry
+            points_list.append({
+                "measurement": "ActivityIndex",
+                "time": points_list[0]["time"],
+                "tags": {"Device": GARMIN_DEVICENAME},
+                "fields": {"ActivityID": activityID, "ActivitySelector": activity_selector, "activityType": activity_type, "hasGPS": True}
+            })
+        points_list = [compact_activity_point(point) for point in points_list]
+    if ACTIVITY_SPATIAL_INDEX:
+        points_list.extend(get_activity_spatial_index(points_list))
+    return activityID, activity_start_time, activity_selector, points_list
+
+def scan_fit_folder():
+    for root, _, file_names in os.walk(FIT_WATCH_FOLDER):
+        for file_name in file_names:
+            if not file_name.lower().endswith(".fit"):
+                continue
+            file_path = os.path.join(root, file_name)
+            try:
+                file_stat = os.stat(file_path)
+            except FileNotFoundError:
+                continue
+            file_signature = (file_stat.st_mtime, file_stat.st_size)
+            if fit_folder_seen_files.get(file_path) == file_signature or time.time() - file_stat.st_mtime < 5: # unchanged, or still being copied
+                continue
+            with open(file_path, "rb") as f:
+                fit_data = f.read()
+            file_hash = hashlib.sha256(fit_data).hexdigest()
+            with fit_ingest_lock:
+                if fit_ingest_db.execute("SELECT 1 FROM ingested_fit_files WHERE sha256 = ?", (file_hash,)).fetchone():
+                    fit_folder_seen_files[file_path] = file_signature
+                    continue
+            try:
+                activityID, activity_start_time, activity_selector, points_list = ingest_fit_file(file_path, fit_data)
+            except (FitParseError, StopIteration, IndexError, KeyError, AttributeError) as err:
+                logging.error(f"Failed : Unable to parse local FIT file {file_path} - {err}")
+                fit_folder_seen_files[file_path] = file_signature
+                continue
+            if not write_points(points_list): # not recorded, so the file is read again on the next scan
+                logging.warning(f"Retrying : local FIT file {file_path} could not be written to all output sinks - will retry on the next scan")
+                continue
+            fit_folder_seen_files[file_path] = file_signature
+            with fit_ingest_lock, fit_ingest_db:
+                fit_ingest_db.execute("INSERT OR IGNORE INTO ingested_fit_files (sha256, file_path, activity_id, activity_start, activity_type, activity_selector, ingested_at) VALUES (?, ?, ?, ?, ?, ?, ?)", (file_hash, file_path, activityID, activity_start_time.timestamp(), activity_selector.split("UTC-", 1)[-1], activity_selector, time.time()))
+            logging.info(f"Success : Ingested {len(points_list)} GPS points for activity ID {activityID} from local FIT file {file_path}")
+
+def fit_folder_watcher():
+    while True:
+        time.sleep(FIT_WATCH_POLL_SECONDS)
+        try:
+            scan_fit_folder()
+        except Exception as err: # files that were not written are not recorded and are picked up again on the next scan
+            logging.error(f"Unable to scan FIT watch folder {FIT_WATCH_FOLDER} - {err}")
+
+def start_fit_folder_watcher():
+    open_fit_ingest_db()
+    logging.info(f"Scanning FIT watch folder {FIT_WATCH_FOLDER} for new activity files...")
+    scan_fit_folder()
+    threading.Thread(target=fit_folder_watcher, name="fit-folder-watcher", daemon=True).start()
+
+# %%
+HR_ZONE_LOWER_BOUNDS = [0.5, 0.6, 0.7, 0.8, 0.9] # fraction of max heart rate where zone 1 to 5 start
+MAX_HR_SAMPLE_SECONDS = 300 # longer gaps between samples (watch not worn) are not counted as time at that heart rate
+ACUTE_LOAD_DAYS = 7
+CHRONIC_LOAD_DAYS = 28
+
+def hr_arrays_from_points(points_list, field_name):
+    samples = [(datetime.fromisoformat(point["time"]), point["fields"].get(field_name)) for point in points_list if point["fields"].get(field_name)]
+    timestamps = np.array([(sample_time if sample_time.tzinfo else sample_time.replace(tzinfo=pytz.UTC)).timestamp() for sample_time, _ in samples], dtype=np.float64)
+    heart_rates = np.array([heart_rate for _, heart_rate in samples], dtype=np.float64)
+    return timestamps, heart_rates
+
+def get_daily_training_metrics(date_str, hr_points_list, activity_gps_points_list, daily_stats_points_list):
+    timestamps, heart_rates = hr_arrays_from_points(hr_points_list, "HeartRate")
+    # Per second activity heart rate replaces the 2 minute intraday samples within each activity's own time span, clipped to the local day
+    day_start = (datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=pytz.UTC) - local_timediff).timestamp()
+    day_end = day_start + 86400
+    activity_gps_points_dict = {}
+    for point in activity_gps_points_list:
+        activity_gps_points_dict.setdefault(point["fields"].get("ActivityID"), []).append(point)
+    outside_activity = np.ones(timestamps.size, dtype=bool)
+    activity_timestamps_list, activity_heart_rates_list = [], []
+    for activity_gps_points in activity_gps_points_dict.values():
+        gps_timestamps, gps_heart_rates = hr_arrays_from_points(activity_gps_points, "HeartRate")
+        within_day = (gps_timestamps >= day_start) & (gps_timestamps < day_end)
+        gps_timestamps, gps_heart_rates = gps_timestamps[within_day], gps_heart_rates[within_day]
+        if gps_timestamps.size:
+            outside_activity &= (timestamps < gps_timestamps.min()) | (timestamps > gps_timestamps.max())
+            activity_timestamps_list.append(gps_timestamps)
+            activity_heart_rates_list.append(gps_heart_rates)
+    timestamps = np.concatenate([timestamps[outside_activity]] + activity_timestamps_list)
+    heart_rates = np.concatenate([heart_rates[outside_activity]] + activity_heart_rates_list)
+    if not timestamps.size:
+        return []
+    order = np.argsort(timestamps)
+    timestamps, heart_rates = timestamps[order], heart_rates[order]
+    if timestamps.size > 1:
+        sample_seconds = np.minimum(np.diff(timestamps, append=timestamps[-1] + np.median(np.diff(timestamps))), MAX_HR_SAMPLE_SECONDS)
+    else:
+        sample_seconds = np.array([120.0])
+
+    resting_hr = USER_RESTING_HEART_RATE or next((point["fields"].get("restingHeartRate") for point in daily_stats_points_list if point["fields"].get("restingHeartRate")), None) or 60
+    hr_reserve = np.clip((heart_rates - resting_hr) / (USER_MAX_HEART_RATE - resting_hr), 0, 1)
+    trimp = float(np.sum(sample_seconds / 60 * hr_reserve * 0.64 * np.exp(1.92 * hr_reserve))) # Banister TRIMP
+    zone_seconds = np.bincount(np.digitize(heart_rates / USER_MAX_HEART_RATE, HR_ZONE_LOWER_BOUNDS), weights=sample_seconds, minlength=len(HR_ZONE_LOWER_BOUNDS) + 1)
+
+    fields = {"TRIMP": round(trimp, 2), "restingHeartRateUsed": float(resting_hr), "hrSampleCount": int(timestamps.size)}
+    for zone in range(1, len(HR_ZONE_LOWER_BOUNDS) + 1):
+        fields[f"hrTimeInZone_{zone}"] = int(zone_seconds[zone])
+    logging.info(f"Success : Computed daily training metrics (TRIMP {fields['TRIMP']}) for date {date_str}")
+    return [{
+        "measurement": "TrainingLoad",
+        "time": datetime.strptime(date_str, "%Y-%m-%d").replace(hour=12, tzinfo=pytz.UTC).isoformat(), # Use GMT 12:00 for daily record
+        "tags": {
+            "Device": GARMIN_DEVICENAME
+        },
+        "fields": fields
+    }]
+
+def get_training_load_series(start_date_str, end_date_str):
+    # Incremental update : acute/chronic loads continue from the last stored values before start_date_str, using only the stored daily TRIMP
+    start_date = datetime.strptime(start_date_str, "%Y-%m-%d").replace(hour=12, tzinfo=pytz.UTC)
+    end_date = datetime.strptime(end_date_str, "%Y-%m-%d").replace(hour=12, tzinfo=pytz.UTC)
+    seed_points = list(influxdbclient.query(f"SELECT \"acuteLoad\", \"chronicLoad\" FROM \"TrainingLoad\" WHERE time < '{start_date.strftime('%Y-%m-%dT%H:%M:%SZ')}' AND \"chronicLoad\" >= 0 ORDER BY time DESC LIMIT 1").get_points())
+    if seed_points:
+        current_date = datetime.fromisoformat(seed_points[0]["time"].replace("Z", "+00:00")) + timedelta(days=1)
+        acute_load, chronic_load = seed_points[0]["acuteLoad"], seed_points[0]["chronicLoad"]
+    else:
+        current_date, acute_load, chronic_load = start_date, 0.0, 0.0
+    history_start = min(current_date, start_date) - timedelta(days=CHRONIC_LOAD_DAYS - 1)
+    daily_trimp = {point["time"][:10]: point["TRIMP"] for point in influxdbclient.query(f"SELECT \"TRIMP\" FROM \"TrainingLoad\" WHERE time >= '{history_start.strftime('%Y-%m-%dT%H:%M:%SZ')}' AND time <= '{end_date.strftime('%Y-%m-%dT%H:%M:%SZ')}'").get_points() if point["TRIMP"] is not None}
+    if not any(start_date_str <= date <= end_date_str for date in daily_trimp):
+        return []
+
+    day_count = (end_date - history_start).days + 1
+    all_dates = [(history_start + timedelta(days=offset)).strftime("%Y-%m-%d") for offset in range(day_count)]
+    trimp_array = np.array([daily_trimp.get(date, 0.0) for date in all_dates], dtype=np.float64)
+    has_trimp = np.array([date in daily_trimp for date in all_dates], dtype=np.float64)
+    window = np.ones(CHRONIC_LOAD_DAYS)
+    baseline = np.convolve(trimp_array, window)[:day_count] / np.maximum(np.convolve(has_trimp, window)[:day_count], 1) # rolling mean of days with data
+
+    acute_decay, chronic_decay = 1 - np.exp(-1 / ACUTE_LOAD_DAYS), 1 - np.exp(-1 / CHRONIC_LOAD_DAYS)
+    points_list = []
+    for index in range((current_date - history_start).days, day_count):
+        acute_load += (trimp_array[index] - acute_load) * acute_decay
+        chronic_load += (trimp_array[index] - chronic_load) * chronic_decay
+        if all_dates[index] >= start_date_str and all_dates[index] in daily_trimp:
+            points_list.append({
+                "measurement": "TrainingLoad",
+                "time": datetime.strptime(all_dates[index], "%Y-%m-%d").replace(hour=12, tzinfo=pytz.UTC).isoformat(),
+                "tags": {
+                    "Device": GARMIN_DEVICENAME
+                },
+                "fields": {
+                    "acuteLoad": round(float(acute_load), 2),
+                    "chronicLoad": round(float(chronic_load), 2),
+                    "acuteChronicRatio": round(float(acute_load / chronic_load), 3) if chronic_load > 0 else None,
+                    "trimpBaseline28d": round(float(baseline[index]), 2)
+                }
+            })
+    if points_list:
+        logging.info(f"Success : Updated acute/chronic training load from {start_date_str} to {end_date_str}")
+    return points_list
+
+# Serialises the daily TrainingLoad computation between the main loop and the background GPS workers
+training_load_lock = threading.Lock()
+
+def local_day_time_filter(date_str):
+    day_start = datetime.strptime(date_str, "%Y-%m-%d").replace(tzinfo=pytz.UTC) - local_timediff
+    return f"time >= '{day_start.strftime('%Y-%m-%dT%H:%M:%SZ')}' AND time < '{(day_start + timedelta(days=1)).strftime('%Y-%m-%dT%H:%M:%SZ')}'"
+
+def get_stored_activity_hr_points(date_str):
+    # Activity heart rate already written for the local day (inline, by the background queue or from local FIT files)
+    query = f'SELECT "HeartRate", "ActivityID"::field FROM "ActivityGPS" WHERE {local_day_time_filter(date_str)}'
+    return [{"time": row["time"].replace("Z", "+00:00"), "fields": {"ActivityID": row["ActivityID"], "HeartRate": row["HeartRate"]}} for row in influxdbclient.query(query).get_points()]
+
+def update_training_load_for_activity(activity_gps_points_list):
+    # Recomputes the TrainingLoad of the local day(s) covered by a queued activity once its GPS data is written
+    activity_dates = sorted({(datetime.fromisoformat(point["time"]).replace(tzinfo=None) + local_timediff).strftime('%Y-%m-%d') for point in activity_gps_points_list if point["measurement"] == "ActivityGPS"})
+    if not activity_dates:
+        return
+    with training_load_lock:
+        for date_str in activity_dates:
+            hr_points_list = [{"time": row["time"].replace("Z", "+00:00"), "fields": {"HeartRate": row["HeartRate"]}} for row in influxdbclient.query(f'SELECT "HeartRate" FROM "HeartRateIntraday" WHERE {local_day_time_filter(date_str)}').get_points()]
+            daily_stats_points_list = [{"fields": row} for row in influxdbclient.query(f'SELECT "restingHeartRate" FROM "DailyStats" WHERE {local_day_time_filter(date_str)}').get_points()]
+            write_points(get_daily_training_metrics(date_str, hr_points_list, get_stored_activity_hr_points(date_str), daily_stats_points_list))
+        write_points(get_training_load_series(activity_dates[0], max(activity_dates[-1], datetime.today().strftime('%Y-%m-%d'))))
+
+# %%
 def daily_fetch_write(date_str):
-    write_points_to_influxdb(get_daily_stats(date_str))
-    write_points_to_influxdb(get_sleep_data(date_str))
-    write_points_to_influxdb(get_intraday_steps(date_str))
-    write_points_to_influxdb(get_intraday_hr(date_str))
-    write_points_to_influxdb(get_intraday_stress(date_str))
-    write_points_to_influxdb(get_intraday_br(date_str))
-    write_points_to_influxdb(get_intraday_hrv(date_str))
-    write_points_to_influxdb(get_body_composition(date_str))
+    daily_stats_points_list = get_daily_stats(date_str)
+    write_points(daily_stats_points_list)
+    write_points(get_sleep_data(date_str))
+    write_points(get_intraday_steps(date_str))
+    hr_points_list = get_intraday_hr(date_str)
+    write_points(hr_points_list)
+    write_points(get_intraday_stress(date_str))
+    write_points(get_intraday_br(date_str))
+    write_points(get_intraday_hrv(date_str))
+    write_points(get_body_composition(date_str))
     activity_summary_points_list, activity_with_gps_id_dict = get_activity_summary(date_str)
-    write_points_to_influxdb(activity_summary_points_list)
-    write_points_to_influxdb(fetch_activity_GPS(activity_with_gps_id_dict))
+    write_points(activity_summary_points_list)
+    if ACTIVITY_GPS_QUEUE:
+        enqueue_activity_gps_jobs(activity_with_gps_id_dict)
+    else:
+        write_points(fetch_activity_GPS(activity_with_gps_id_dict))
+    if TRAINING_LOAD_ANALYTICS:
+        with training_load_lock:
+            # Read back from InfluxDB : activities parsed earlier in this runtime are not fetched again, and queued ones update the day when their job finishes
+            write_points(get_daily_training_metrics(date_str, hr_points_list, get_stored_activity_hr_points(date_str), daily_stats_points_list))
     if FETCH_ADVANCED_TRAINING_DATA: # Contribution from PR #17 by @arturgoms 
-        write_points_to_influxdb(get_training_readiness(date_str))
-        write_points_to_influxdb(get_hillscore(date_str))
-        write_points_to_influxdb(get_race_predictions(date_str))
-        write_points_to_influxdb(get_vo2_max(date_str))
+        write_points(get_training_readiness(date_str))
+        write_points(get_hillscore(date_str))
+        write_points(get_race_predictions(date_str))
+        write_points(get_vo2_max(date_str))
 
 # %%
-def fetch_write_bulk(start_date_str, end_date_str):
+def fetch_write_date(current_date, daily_fetch_function=daily_fetch_write):
     global garmin_obj
+    repeat_loop = True
+    while repeat_loop:
+        try:
+            daily_fetch_function(current_date)
+            logging.info(f"Success : Fetched all available health metrics for date {current_date} (skipped any if unavailable)")
+            logging.info(f"Waiting : for {RATE_LIMIT_CALLS_SECONDS} seconds")
+            time.sleep(RATE_LIMIT_CALLS_SECONDS)
+            repeat_loop = False
+        except GarminConnectTooManyRequestsError as err:
+            logging.error(err)
+            logging.info(f"Too many requests (429) : Failed to fetch one or more matrices - will retry for date {current_date}")
+            logging.info(f"Waiting : for {FETCH_FAILED_WAIT_SECONDS} seconds")
+            time.sleep(FETCH_FAILED_WAIT_SECONDS)
+            repeat_loop = True
+        except (
+                GarminConnectConnectionError,
+                requests.exceptions.HTTPError,
+                requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+                GarthHTTPError
+                ) as err:
+            logging.error(err)
+            logging.info(f"Connection Error : Failed to fetch one or more matrices - skipping date {current_date}")
+            logging.info(f"Waiting : for {RATE_LIMIT_CALLS_SECONDS} seconds")
+            time.sleep(RATE_LIMIT_CALLS_SECONDS)
+            repeat_loop = False
+        except GarminConnectAuthenticationError as err:
+            logging.error(err)
+            logging.info(f"Authentication Failed : Retrying login with given credentials (won't work automatically for MFA/2FA enabled accounts)")
+            garmin_obj = garmin_login()
+            time.sleep(5)
+            repeat_loop = True
+
+# %%
+def fetch_write_bulk(start_date_str, end_date_str):
     logging.info("Fetching data for the given period in reverse chronological order")
     time.sleep(3)
-    write_points_to_influxdb(get_last_sync())
+    write_points(get_last_sync())
     for current_date in iter_days(start_date_str, end_date_str):
-        repeat_loop = True
-        while repeat_loop:
-            try:
-                daily_fetch_write(current_date)
-                logging.info(f"Success : Fetched all available health metrics for date {current_date} (skipped any if unavailable)")
-                logging.info(f"Waiting : for {RATE_LIMIT_CALLS_SECONDS} seconds")
-                time.sleep(RATE_LIMIT_CALLS_SECONDS)
-                repeat_loop = False
-            except GarminConnectTooManyRequestsError as err:
-                logging.error(err)
-                logging.info(f"Too many requests (429) : Failed to fetch one or more matrices - will retry for date {current_date}")
-                logging.info(f"Waiting : for {FETCH_FAILED_WAIT_SECONDS} seconds")
-                time.sleep(FETCH_FAILED_WAIT_SECONDS)
-                repeat_loop = True
-            except (
-                    GarminConnectConnectionError,
-                    requests.exceptions.HTTPError,
-                    requests.exceptions.ConnectionError,
-                    requests.exceptions.Timeout,
-                    GarthHTTPError
-                    ) as err:
-                logging.error(err)
-                logging.info(f"Connection Error : Failed to fetch one or more matrices - skipping date {current_date}")
-                logging.info(f"Waiting : for {RATE_LIMIT_CALLS_SECONDS} seconds")
-                time.sleep(RATE_LIMIT_CALLS_SECONDS)
-                repeat_loop = False
-            except GarminConnectAuthenticationError as err:
-                logging.error(err)
-                logging.info(f"Authentication Failed : Retrying login with given credentials (won't work automatically for MFA/2FA enabled accounts)")
-                garmin_obj = garmin_login()
-                time.sleep(5)
-                repeat_loop = True
+        fetch_write_date(current_date)
+    if TRAINING_LOAD_ANALYTICS: # dates are fetched in reverse order, so the loads are updated chronologically at the end (including later days that depend on them)
+        write_points(get_training_load_series(start_date_str, max(end_date_str, datetime.today().strftime('%Y-%m-%d'))))
+
+# %%
+# Measurements expected every day : (field used for counting, fetcher that re-creates the measurement for a date)
+GAP_SCAN_MEASUREMENTS = {
+    "DailyStats": ("totalSteps", get_daily_stats),
+    "SleepSummary": ("sleepTimeSeconds", get_sleep_data),
+    "HeartRateIntraday": ("HeartRate", get_intraday_hr),
+    "StepsIntraday": ("StepsCount", get_intraday_steps),
+    "StressIntraday": ("stressLevel", get_intraday_stress),
+    "BodyBatteryIntraday": ("BodyBatteryLevel", get_intraday_stress),
+    "BreathingRateIntraday": ("BreathingRate", get_intraday_br),
+}
+
+def find_data_gaps(start_date_str, end_date_str, local_timediff):
+    # Daily buckets are shifted to the user's local midnight so they line up with the dates the fetchers request
+    range_start_UTC = datetime.strptime(start_date_str, '%Y-%m-%d') - local_timediff
+    range_end_UTC = datetime.strptime(end_date_str, '%Y-%m-%d') + timedelta(days=1) - local_timediff
+    bucket_offset_seconds = int(-local_timediff.total_seconds()) % 86400
+    all_dates = list(iter_days(start_date_str, end_date_str))
+    gaps = {}
+    for measurement, (field, fetch_function) in GAP_SCAN_MEASUREMENTS.items():
+        query = f"SELECT COUNT(\"{field}\") FROM \"{measurement}\" WHERE \"Device\"::tag = '{GARMIN_DEVICENAME}' AND time >= '{range_start_UTC.strftime('%Y-%m-%dT%H:%M:%SZ')}' AND time < '{range_end_UTC.strftime('%Y-%m-%dT%H:%M:%SZ')}' GROUP BY time(1d, {bucket_offset_seconds}s) fill(0)"
+        daily_counts = {}
+        for point in influxdbclient.query(query).get_points():
+            bucket_local_date = (datetime.fromisoformat(point['time'].replace("Z", "+00:00")) + local_timediff).strftime('%Y-%m-%d')
+            daily_counts[bucket_local_date] = point['count']
+        nonzero_counts = sorted(count for count in daily_counts.values() if count)
+        median_count = nonzero_counts[len(nonzero_counts) // 2] if nonzero_counts else 0
+        for date_str in all_dates:
+            count = daily_counts.get(date_str, 0)
+            if count == 0 or count < GAP_SCAN_MIN_COVERAGE * median_count:
+                logging.debug(f"Gap found : {measurement} has {count} points for date {date_str} (median {median_count})")
+                gaps.setdefault(date_str, {})[measurement] = fetch_function
+    return gaps
+
+def fetch_write_gaps(start_date_str, end_date_str, local_timediff):
+    write_points(get_last_sync()) # sets GARMIN_DEVICENAME so gaps are counted and repaired in the current device's series
+    logging.info(f"Scanning InfluxDB for missing or incomplete days between {start_date_str} and {end_date_str}")
+    gaps = find_data_gaps(start_date_str, end_date_str, local_timediff)
+    logging.info(f"Gap scan complete : {sum(len(measurements) for measurements in gaps.values())} missing (date, measurement) pairs found across {len(gaps)} dates")
+    for current_date in sorted(gaps, reverse=True):
+        fetch_functions = list(dict.fromkeys(gaps[current_date].values())) # shared fetchers (stress and body battery) run only once
+        logging.info(f"Repairing : {', '.join(gaps[current_date])} for date {current_date}")
+        fetch_write_date(current_date, lambda date_str: [write_points(fetch_function(date_str)) for fetch_function in fetch_functions])
+
+# %%
+SYNC_PROFILE_SLOT_MINUTES = 30
+
+def load_sync_history():
+    try:
+        sync_points = influxdbclient.query(f"SELECT \"Device\"::field FROM DeviceSync WHERE time > now() - {ADAPTIVE_POLLING_HISTORY_DAYS}d").get_points()
+        return [datetime.fromisoformat(point['time'].replace("Z", "+00:00")) for point in sync_points]
+    except InfluxDBClientError as err:
+        logging.warning(f"Unable to load previous DeviceSync history for adaptive polling : {err}")
+        return []
+
+def build_sync_profile(sync_times):
+    slot_count = 24 * 60 // SYNC_PROFILE_SLOT_MINUTES
+    slot_days = [set() for _ in range(slot_count)]
+    for sync_time in sync_times:
+        sync_time = sync_time.astimezone(pytz.UTC)
+        slot_days[(sync_time.hour * 60 + sync_time.minute) // SYNC_PROFILE_SLOT_MINUTES].add(sync_time.date())
+    total_days = max(len({sync_time.astimezone(pytz.UTC).date() for sync_time in sync_times}), 1)
+    return [len(days) / total_days for days in slot_days]
+
+def next_poll_interval(now_UTC, sync_profile, idle_interval):
+    # Poll at the regular interval inside a time slot where syncs usually happen, otherwise back off but wake up for the next likely slot
+    slot_seconds = SYNC_PROFILE_SLOT_MINUTES * 60
+    seconds_of_day = now_UTC.hour * 3600 + now_UTC.minute * 60 + now_UTC.second
+    current_slot = seconds_of_day // slot_seconds
+    if sync_profile[current_slot] >= ADAPTIVE_POLLING_SYNC_RATIO:
+        return ADAPTIVE_POLLING_MIN_SECONDS
+    interval = min(idle_interval, ADAPTIVE_POLLING_MAX_SECONDS)
+    for offset in range(1, len(sync_profile) + 1):
+        if sync_profile[(current_slot + offset) % len(sync_profile)] >= ADAPTIVE_POLLING_SYNC_RATIO:
+            interval = min(interval, (current_slot + offset) * slot_seconds - seconds_of_day)
+            break
+    return max(interval, ADAPTIVE_POLLING_MIN_SECONDS)
+
+# %%
+def migrate_activity_schema():
+    # Rewrites legacy ActivityGPS / ActivitySummary series (ActivityID and ActivitySelector as tags) to the compact schema, one activity at a time
+    kept_series_count = 0
+    for measurement in ["ActivitySummary", "ActivityGPS"]:
+        activity_ids = [point['value'] for point in influxdbclient.query(f'SHOW TAG VALUES FROM "{measurement}" WITH KEY = "ActivityID"').get_points()]
+        logging.info(f"Migration : found {len(activity_ids)} activities with legacy tags in {measurement}")
+        for activity_id in activity_ids:
+            # ActivityGPS also has an integer ActivityID field, which InfluxDB would pick over the tag without the ::tag qualifier
+            result = influxdbclient.query(f'SELECT *::field FROM "{measurement}" WHERE "ActivityID"::tag = \'{activity_id}\' GROUP BY "Device", "ActivitySelector"')
+            points_list = []
+            source_point_count = 0
+            for (_, series_tags), series_points in result.items():
+                activity_selector = series_tags.get("ActivitySelector") or ""
+                for row in series_points:
+                    source_point_count += 1
+                    point_time = row.pop("time")
+                    points_list.append(compact_activity_point({
+                        "measurement": measurement,
+                        "time": point_time,
+                        "tags": {
+                            "Device": series_tags.get("Device") or GARMIN_DEVICENAME,
+                            "ActivityID": int(activity_id),
+                            "ActivitySelector": activity_selector
+                        },
+                        "fields": {key: value for key, value in row.items() if value is not None}
+                    }))
+                if activity_selector:
+                    index_fields = {"ActivityID": int(activity_id), "ActivitySelector": activity_selector, "activityType": activity_selector.split("UTC-", 1)[-1]}
+                    if measurement == "ActivityGPS":
+                        index_fields["hasGPS"] = True
+                    points_list.append({
+                        "measurement": "ActivityIndex",
+                        "time": datetime.strptime(activity_selector.split("UTC-", 1)[0], '%Y%m%dT%H%M%S').replace(tzinfo=pytz.UTC).isoformat(),
+                        "tags": {"Device": series_tags.get("Device") or GARMIN_DEVICENAME},
+                        "fields": index_fields
+                    })
+            if source_point_count == 0:
+                logging.warning(f"Migration : no legacy points found for activity id {activity_id} in {measurement} - skipping")
+                continue
+            influxdbclient.write_points(points_list, batch_size=MIGRATION_BATCH_SIZE)
+            # Only drop the legacy series once every source point is readable back from the compact series (no ActivityID tag)
+            count_rows = list(influxdbclient.query(f'SELECT COUNT("ActivitySelector"::field) FROM "{measurement}" WHERE "ActivityID"::field = {int(activity_id)} AND "ActivityID"::tag = \'\'').get_points())
+            rewritten_point_count = count_rows[0]["count"] if count_rows else 0
+            if rewritten_point_count != source_point_count:
+                logging.error(f"Migration : activity id {activity_id} in {measurement} has {source_point_count} legacy points but {rewritten_point_count} compact points - legacy series kept")
+                kept_series_count += 1
+                continue
+            influxdbclient.query(f'DROP SERIES FROM "{measurement}" WHERE "ActivityID" = \'{activity_id}\'')
+            logging.info(f"Migration : rewritten {rewritten_point_count} points for activity id {activity_id} in {measurement}")
+    return kept_series_count
+
+if MIGRATE_ACTIVITY_SCHEMA:
+    if ACTIVITY_SCHEMA_MODE != "compact":
+        logging.warning("Migrating activity data to the compact schema - remember to set ACTIVITY_SCHEMA_MODE=compact for future runs")
+    kept_series_count = migrate_activity_schema()
+    if kept_series_count:
+        logging.error(f"Migration incomplete : {kept_series_count} activities could not be verified and are still stored with legacy tags - check the log above and re-run the migration")
+        exit(1)
+    logging.info("Migration success : All activity data is rewritten to the compact schema")
+    exit(0)
+
+def build_activity_spatial_index():
+    # Backfills ActivitySpatialIndex from the ActivityGPS data already stored, one activity at a time
+    if ACTIVITY_SCHEMA_MODE == "compact":
+        activity_ids = sorted({point["ActivityID"] for point in influxdbclient.query('SELECT "ActivityID" FROM "ActivityIndex" WHERE "hasGPS" = true').get_points()})
+        activity_filter = lambda activity_id: f'"ActivityID"::field = {activity_id}'
+    else:
+        activity_ids = [point['value'] for point in influxdbclient.query('SHOW TAG VALUES FROM "ActivityGPS" WITH KEY = "ActivityID"').get_points()]
+        activity_filter = lambda activity_id: f'"ActivityID"::tag = \'{activity_id}\'' # legacy ActivityGPS also has an integer ActivityID field, which InfluxDB would pick over the tag
+    logging.info(f"Spatial index : found {len(activity_ids)} activities with GPS data")
+    for activity_id in activity_ids:
+        result = influxdbclient.query(f'SELECT "Latitude", "Longitude", "ActivitySelector" FROM "ActivityGPS" WHERE {activity_filter(activity_id)} GROUP BY "Device"')
+        gps_points_list = []
+        for (_, series_tags), series_points in result.items():
+            for row in series_points:
+                gps_points_list.append({
+                    "measurement": "ActivityGPS",
+                    "time": row["time"],
+                    "tags": {"Device": series_tags.get("Device") or GARMIN_DEVICENAME},
+                    "fields": {"ActivityID": int(activity_id), "ActivitySelector": row["ActivitySelector"], "Latitude": row["Latitude"], "Longitude": row["Longitude"]}
+                })
+        points_list = get_activity_spatial_index(gps_points_list)
+        write_points(points_list)
+        logging.info(f"Spatial index : indexed activity id {activity_id} ({len(gps_points_list)} GPS points)")
+
+if BUILD_ACTIVITY_SPATIAL_INDEX:
+    build_activity_spatial_index()
+    logging.info("Spatial index success : All stored activities are indexed")
+    exit(0)
 
+if ACTIVITY_AREA_QUERY:
+    min_latitude, min_longitude, max_latitude, max_longitude = [float(value) for value in ACTIVITY_AREA_QUERY.split(",")]
+    matching_activities = find_activities_in_area(min_latitude, min_longitude, max_latitude, max_longitude)
+    for activity in matching_activities:
+        logging.info(f"Area match : {activity['time']} activity id {activity['ActivityID']} ({activity['ActivitySelector']})")
+    logging.info(f"Area query success : {len(matching_activities)} activities intersect the given area")
+    exit(0)
 
 # %%
 garmin_obj = garmin_login()
+if FIT_WATCH_FOLDER:
+    start_fit_folder_watcher()
+if ACTIVITY_GPS_QUEUE:
+    start_activity_gps_workers()
+
+# %%
+try:
+    last_activity_dict = garmin_obj.get_last_activity() # (very unlineky event that this will be empty given Garmin's userbase, everyone should have at least one activity)
+    local_timediff = datetime.strptime(last_activity_dict['startTimeLocal'], '%Y-%m-%d %H:%M:%S') - datetime.strptime(last_activity_dict['startTimeGMT'], '%Y-%m-%d %H:%M:%S')
+    if datetime.strptime(last_activity_dict['startTimeLocal'], '%Y-%m-%d %H:%M:%S') > datetime.strptime(last_activity_dict['startTimeGMT'], '%Y-%m-%d %H:%M:%S'):
+        logging.info("Automatically identified user's local timezone as UTC+" + str(local_timediff))
+    else:
+        logging.info("Automatically identified user's local timezone as UTC-" + str(-local_timediff))
+except KeyError as err:
+    logging.warning(f"Unable to automatically determine user's timezone from recent activity data. Defaulting to UTC offset of 0.")
+    local_timediff = timedelta(hours=0)
 
 # %%
 if MANUAL_START_DATE:
+    if GAP_REPAIR_MODE:
+        fetch_write_gaps(MANUAL_START_DATE, MANUAL_END_DATE, local_timediff)
+        logging.info(f"Gap repair success : Re-fetched all missing health metrics for date range {MANUAL_START_DATE} to {MANUAL_END_DATE}")
+        exit(0)
     fetch_write_bulk(MANUAL_START_DATE, MANUAL_END_DATE)
+    if ACTIVITY_GPS_QUEUE:
+        wait_for_activity_gps_queue()
     logging.info(f"Bulk update success : Fetched all available health metrics for date range {MANUAL_START_DATE} to {MANUAL_END_DATE}")
     exit(0)
 else:
@@ -885,25 +1558,29 @@ else:
     except:
         logging.warning("No previously synced data found in local InfluxDB database, defaulting to 7 day initial fetching. Use specific start date ENV variable to bulk update past data")
         last_influxdb_sync_time_UTC = (datetime.today() - timedelta(days=7)).astimezone(pytz.timezone("UTC"))
-    try:
-        last_activity_dict = garmin_obj.get_last_activity() # (very unlineky event that this will be empty given Garmin's userbase, everyone should have at least one activity)
-        local_timediff = datetime.strptime(last_activity_dict['startTimeLocal'], '%Y-%m-%d %H:%M:%S') - datetime.strptime(last_activity_dict['startTimeGMT'], '%Y-%m-%d %H:%M:%S')
-        if datetime.strptime(last_activity_dict['startTimeLocal'], '%Y-%m-%d %H:%M:%S') > datetime.strptime(last_activity_dict['startTimeGMT'], '%Y-%m-%d %H:%M:%S'):
-            logging.info("Automatically identified user's local timezone as UTC+" + str(local_timediff))
-        else:
-            logging.info("Automatically identified user's local timezone as UTC-" + str(-local_timediff))
-    except KeyError as err:
-        logging.warning(f"Unable to automatically determine user's timezone from recent activity data. Defaulting to UTC offset of 0.")
-        local_timediff = timedelta(hours=0)
     
+    if ADAPTIVE_POLLING:
+        sync_history = load_sync_history()
+        sync_profile = build_sync_profile(sync_history)
+        idle_interval = ADAPTIVE_POLLING_MIN_SECONDS
+        logging.info(f"Adaptive polling enabled : learned watch sync pattern from {len(sync_history)} previous syncs")
+
     while True:
         last_watch_sync_time_UTC = datetime.fromtimestamp(int(garmin_obj.get_device_last_used().get('lastUsedDeviceUploadTime')/1000)).astimezone(pytz.timezone("UTC"))
         if last_influxdb_sync_time_UTC < last_watch_sync_time_UTC:
             logging.info(f"Update found : Current watch sync time is {last_watch_sync_time_UTC} UTC")
             fetch_write_bulk((last_influxdb_sync_time_UTC + local_timediff).strftime('%Y-%m-%d'), (last_watch_sync_time_UTC + local_timediff).strftime('%Y-%m-%d')) # Using local dates for deciding which dates to fetch in current iteration (see issue #25)
             last_influxdb_sync_time_UTC = last_watch_sync_time_UTC
+            if ADAPTIVE_POLLING:
+                sync_history.append(last_watch_sync_time_UTC)
+                sync_history = [sync_time for sync_time in sync_history if sync_time > last_watch_sync_time_UTC - timedelta(days=ADAPTIVE_POLLING_HISTORY_DAYS)]
+                sync_profile = build_sync_profile(sync_history)
+                idle_interval = ADAPTIVE_POLLING_MIN_SECONDS
         else:
             logging.info(f"No new data found : Current watch and influxdb sync time is {last_watch_sync_time_UTC} UTC")
-        logging.info(f"waiting for {UPDATE_INTERVAL_SECONDS} seconds before next automatic update calls")
-        time.sleep(UPDATE_INTERVAL_SECONDS)
+            if ADAPTIVE_POLLING:
+                idle_interval = min(idle_interval * 2, ADAPTIVE_POLLING_MAX_SECONDS)
+        wait_seconds = next_poll_interval(datetime.now(pytz.UTC), sync_profile, idle_interval) if ADAPTIVE_POLLING else UPDATE_INTERVAL_SECONDS
+        logging.info(f"waiting for {wait_seconds} seconds before next automatic update calls")
+        time.sleep(wait_seconds)
         